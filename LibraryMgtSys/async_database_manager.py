@@ -0,0 +1,292 @@
+"""
+asyncio version of DatabaseManager, on SQLAlchemy's asyncio extension + asyncpg.
+
+Same statements as the sync manager (both build them with queries.py), so the
+locking and the set-based writes behave identically; only the I/O is awaited.
+Meant for async web frameworks where one event loop serves many requests and
+a thread per request would be the bottleneck.
+
+    db = AsyncDatabaseManager()
+    ok = await db.borrow_item(member_id, item_id)
+    ...
+    await db.dispose()
+
+Requires asyncpg (pip install asyncpg). The URL from DatabaseConfig is reused;
+its driver is switched to postgresql+asyncpg.
+Not a singleton: an async engine belongs to the event loop it was created on.
+"""
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import List, Optional, Dict, Any
+import random
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from models import (
+    LibraryItemModel, MemberModel, WaitingListModel, NotificationModel, loan_due_date, HOLD_PERIOD_DAYS,
+    COOCCURRENCE_RECENT_ITEMS, STAT_SHARDS
+)
+from db_config import DatabaseConfig
+import queries
+
+
+class AsyncDatabaseManager:
+    """
+    Async counterpart of DatabaseManager for borrowing, search,
+    waiting lists and notifications.
+    Objects are returned detached-but-loaded (expire_on_commit=False);
+    lazy-loading relationships on them is not possible in asyncio, so use the ids.
+    """
+
+    def __init__(self, config: Optional[DatabaseConfig] = None):
+        self.config = config or DatabaseConfig.from_env()
+
+        self.engine = create_async_engine(self._async_url(self.config.url), **self._engine_options(self.config))
+
+        # expire_on_commit=False: attributes stay readable after the commit
+        # (an expired attribute would need an implicit, i.e. blocking, refresh)
+        self.SessionLocal = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+
+    @staticmethod
+    def _async_url(url: str) -> str:
+        """postgresql://... or postgresql+psycopg2://... -> postgresql+asyncpg://..."""
+        parsed = make_url(url)
+        if parsed.get_backend_name() == 'postgresql':
+            parsed = parsed.set(drivername='postgresql+asyncpg')
+        return parsed.render_as_string(hide_password=False)
+
+    @staticmethod
+    def _engine_options(config: DatabaseConfig) -> Dict[str, Any]:
+        """create_async_engine() keyword arguments for a config (same pool settings as the sync engine)."""
+        options = {
+            'echo': config.echo,
+            'pool_size': config.pool_size,
+            'max_overflow': config.max_overflow,
+            'pool_timeout': config.pool_timeout,
+            'pool_recycle': config.pool_recycle,
+            'pool_pre_ping': config.pool_pre_ping
+        }
+        if config.statement_timeout_ms:
+            # asyncpg has no libpq 'options'; server settings are passed directly
+            options['connect_args'] = {'server_settings': {'statement_timeout': str(config.statement_timeout_ms)}}
+        return options
+
+    async def dispose(self) -> None:
+        """Close all pooled connections (call before the event loop shuts down)."""
+        await self.engine.dispose()
+
+    @asynccontextmanager
+    async def get_session(self):
+        """
+        Async context manager for sessions; commits on success, rolls back on error.
+
+            async with db.get_session() as session:
+                await session.execute(...)
+        """
+        session: AsyncSession = self.SessionLocal()
+        try:
+            yield session
+            await self._flush_stats(session)
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+    @staticmethod
+    def _count(session: AsyncSession, **deltas: int) -> None:
+        """catalog_stats deltas for this transaction, see DatabaseManager._count."""
+        session.info.setdefault('stats', Counter()).update(deltas)
+
+    @staticmethod
+    async def _flush_stats(session: AsyncSession) -> None:
+        """One UPDATE of the transaction's counters on a random shard, right before the commit."""
+        deltas = {name: delta for name, delta in session.info.pop('stats', {}).items() if delta}
+        if deltas:
+            await session.execute(queries.add_to_stats(deltas, random.randrange(STAT_SHARDS)))
+
+    # ========================
+    # ITEM OPERATIONS
+    # ========================
+    async def get_item_by_id(self, item_id: int) -> Optional[LibraryItemModel]:
+        async with self.get_session() as session:
+            return await session.get(LibraryItemModel, item_id)
+
+    async def search_items(self, query: str) -> List[LibraryItemModel]:
+        """Search items by title or creator (case-insensitive)."""
+        async with self.get_session() as session:
+            return list((await session.scalars(queries.search_items(query))).all())
+
+    async def search_catalog(self, query: str, limit: int = 20, offset: int = 0) -> List[LibraryItemModel]:
+        """Relevance-ranked catalog search, see DatabaseManager.search_catalog."""
+        query = query.strip()
+        if not query:
+            return []
+
+        async with self.get_session() as session:
+            stmt = queries.search_catalog(query, self.engine.dialect.name, limit, offset)
+            return list((await session.scalars(stmt)).all())
+
+    # ========================
+    # BORROWING OPERATIONS
+    # ========================
+    async def borrow_item(self, member_id: int, item_id: int) -> bool:
+        """
+        Record a borrow transaction (same statements as DatabaseManager.borrow_item):
+        lock member + read limit and hold, conditional UPDATE ... RETURNING
+        (or DELETE of the hold), DELETE of the waiting list entry, INSERT loan, one INSERT ... SELECT upsert of the "also borrowed" scores.
+        """
+        async with self.get_session() as session:
+            member = (await session.execute(queries.lock_member_for_borrow(member_id, item_id))).first()
+
+            # no such member, or membership expired
+            if member is None:
+                return False
+            borrow_limit, membership_type, held = member
+
+            claimed = None
+            if held:
+                claimed = (await session.execute(queries.consume_hold(member_id, item_id, borrow_limit))).first()
+                if claimed is not None:
+                    self._count(session, waiting=-1)
+
+            if claimed is None:
+                claimed = (await session.execute(queries.claim_copy(member_id, item_id, borrow_limit))).first()
+
+                # item missing, no copies left, or borrow limit reached
+                if claimed is None:
+                    return False
+                self._count(session, available_copies=-1)
+
+                # off the waiting list; the copy of a hold that expired goes to the next in line
+                left = (await session.execute(queries.remove_waiting_list_entry(member_id, item_id))).first()
+                if left is not None:
+                    self._count(session, waiting=-1)
+                    if left.hold_expires_at is not None:
+                        await self._pass_on_copy(session, item_id)
+
+            self._count(session, active_loans=1)
+            await session.execute(queries.insert_loan(member_id, item_id, loan_due_date(membership_type, datetime.now())))
+            await self._record_cooccurrence(session, member_id, [item_id])
+            return True
+
+    async def _record_cooccurrence(self, session: AsyncSession, member_id: int, item_ids: List[int]) -> None:
+        """Upsert the "also borrowed" pairs of newly borrowed items, see DatabaseManager._record_cooccurrence."""
+        limit = COOCCURRENCE_RECENT_ITEMS + len(item_ids)
+        await session.execute(queries.add_cooccurrence(member_id, item_ids, limit, self.engine.dialect.name))
+
+    async def return_item(self, member_id: int, item_id: int) -> bool:
+        """Close one active loan (FOR UPDATE SKIP LOCKED) and pass the copy on (hold or shelf)."""
+        async with self.get_session() as session:
+            closed = (await session.execute(queries.close_active_loan(member_id, item_id))).first()
+
+            if closed is None:
+                return False
+
+            self._count(session, active_loans=-1)
+            await self._pass_on_copy(session, item_id)
+            return True
+
+    async def _pass_on_copy(self, session: AsyncSession, item_id: int) -> Optional[int]:
+        """Hold the copy for the head of the waiting list, or shelve it; see DatabaseManager._pass_on_copy."""
+        expires_at = datetime.now() + timedelta(days=HOLD_PERIOD_DAYS)
+        hold = (await session.execute(queries.claim_next_hold(item_id, expires_at))).first()
+
+        if hold is None:
+            released = (await session.execute(queries.release_copy(item_id))).rowcount
+            self._count(session, available_copies=released)
+            return None
+
+        return await session.scalar(queries.notify_hold(hold.id, expires_at))
+
+    async def count_active_borrows(self, member_id: int) -> int:
+        async with self.get_session() as session:
+            return await session.scalar(queries.active_loans_count(member_id))
+
+    # ========================
+    # WAITING LIST OPERATIONS
+    # ========================
+    async def join_waiting_list(self, member_id: int, item_id: int) -> bool:
+        """Add member to the waiting list; False if already on it."""
+        async with self.get_session() as session:
+            existing = (await session.scalars(queries.waiting_list_entry(member_id, item_id))).first()
+            if existing:
+                return False
+
+            try:
+                # SAVEPOINT, so a concurrent duplicate only undoes this insert
+                async with session.begin_nested():
+                    session.add(WaitingListModel(member_id=member_id, item_id=item_id))
+            except IntegrityError:
+                return False
+
+            self._count(session, waiting=1)
+            return True
+
+    async def leave_waiting_list(self, member_id: int, item_id: int) -> bool:
+        """Remove member from the waiting list; a copy on hold for them goes to the next in line."""
+        async with self.get_session() as session:
+            left = (await session.execute(queries.remove_waiting_list_entry(member_id, item_id))).first()
+
+            if left is None:
+                return False
+
+            self._count(session, waiting=-1)
+            if left.hold_expires_at is not None:
+                await self._pass_on_copy(session, item_id)
+            return True
+
+    async def get_waiting_list(self, item_id: int) -> List[MemberModel]:
+        """Members waiting for an item, ordered by join time."""
+        async with self.get_session() as session:
+            return list((await session.scalars(queries.waiting_members(item_id))).all())
+
+    async def notify_waiting_members(self, item_id: int) -> int:
+        """Set-based INSERT ... SELECT fan-out; returns the number of notifications created."""
+        async with self.get_session() as session:
+            notified = (await session.scalars(queries.notify_waiting_members(item_id))).all()
+            return len(notified)
+
+    # ========================
+    # NOTIFICATION OPERATIONS
+    # ========================
+    async def create_notification(self, member_id: int, message: str) -> NotificationModel:
+        async with self.get_session() as session:
+            notification = NotificationModel(member_id=member_id, message=message, is_read=False)
+            session.add(notification)
+            # flush so id / created_at are loaded while we still can await
+            await session.flush()
+            await session.refresh(notification)
+            return notification
+
+    async def get_member_notifications(self, member_id: int, unread_only: bool = False) -> List[NotificationModel]:
+        async with self.get_session() as session:
+            stmt = queries.member_notifications(member_id, unread_only)
+            return list((await session.scalars(stmt)).all())
+
+    async def get_notification_inbox(self, member_id: int, unread_only: bool = False, limit: int = 20,
+                                     before_id: Optional[int] = None) -> List[NotificationModel]:
+        """One keyset-paginated page of notifications, see DatabaseManager.get_notification_inbox."""
+        async with self.get_session() as session:
+            stmt = queries.notification_inbox(member_id, unread_only, limit, before_id)
+            return list((await session.scalars(stmt)).all())
+
+    async def get_unread_count(self, member_id: int) -> int:
+        # no cache here: an in-process cache would need the invalidation
+        # bookkeeping of the sync manager, and the count is an index-only read
+        async with self.get_session() as session:
+            return await session.scalar(queries.unread_count(member_id))
+
+    async def mark_notification_read(self, notification_id: int) -> bool:
+        async with self.get_session() as session:
+            member_id = await session.scalar(queries.mark_notification_read(notification_id))
+            return member_id is not None
+
+    async def mark_all_read(self, member_id: int, before: Optional[datetime] = None) -> int:
+        async with self.get_session() as session:
+            result = await session.execute(queries.mark_all_read(member_id, before))
+            return result.rowcount
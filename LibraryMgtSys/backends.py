@@ -0,0 +1,148 @@
+"""
+Database backends for DatabaseManager.
+
+A backend holds everything that differs between databases:
+engine options (pooling, connect args), per-connection setup,
+how the circular member <-> membership insert is made legal, and how to wipe the schema.
+
+    PostgresBackend  the production database, tables live in the 'librarymgtsys' schema
+    SQLiteBackend    file or in-memory database for unit tests and micro-benchmarks
+
+The backend is picked from the URL's dialect (backend_for), e.g.:
+    export LIBRARY_DATABASE_URL=sqlite://                 # in-memory
+    export LIBRARY_DATABASE_URL=sqlite:////tmp/library.db # file
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Dict
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from db_config import DatabaseConfig
+from models import Base
+from pool_metrics import InstrumentedQueuePool
+
+SCHEMA = 'librarymgtsys'
+
+
+class Backend(ABC):
+    """
+    Base class: the options every backend shares.
+    Subclasses implement the per-database hooks (configure, defer_constraints, reset_schema).
+    """
+    name = None
+
+    def engine_options(self, config: DatabaseConfig) -> Dict[str, Any]:
+        """create_engine() keyword arguments for a config."""
+        return {
+            'echo': config.echo,
+            'poolclass': InstrumentedQueuePool,   # QueuePool that also times checkouts
+            'pool_size': config.pool_size,
+            'max_overflow': config.max_overflow,
+            'pool_timeout': config.pool_timeout,
+            'pool_recycle': config.pool_recycle,
+            'pool_pre_ping': config.pool_pre_ping
+        }
+
+    @abstractmethod
+    def configure(self, engine: Engine) -> None:
+        """Hook for engine event listeners (per-connection settings etc.)."""
+
+    @abstractmethod
+    def defer_constraints(self, session: Session) -> None:
+        """
+        Called before inserting a membership and its member, which reference each other.
+        Must make the intermediate state (membership.member_id not set yet) acceptable.
+        """
+
+    @abstractmethod
+    def reset_schema(self, engine: Engine) -> None:
+        """Drop every table (DatabaseManager.drop_tables)."""
+
+
+class PostgresBackend(Backend):
+    name = 'postgresql'
+
+    def engine_options(self, config: DatabaseConfig) -> Dict[str, Any]:
+        options = super().engine_options(config)
+        if config.statement_timeout_ms:
+            # set on every new connection by the server
+            options['connect_args'] = {'options': f'-c statement_timeout={config.statement_timeout_ms}'}
+        return options
+
+    def configure(self, engine: Engine) -> None:
+        # nothing per connection: statement_timeout goes in connect_args
+        pass
+
+    def defer_constraints(self, session: Session) -> None:
+        # to deal with circular reference between member and membership and not null for both side
+        session.execute(text("SET CONSTRAINTS ALL DEFERRED"))
+
+    def reset_schema(self, engine: Engine) -> None:
+        # CASCADE handles the circular dependencies
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+
+
+class SQLiteBackend(Backend):
+    """
+    SQLite has no schemas, so 'librarymgtsys.<table>' is rendered as plain '<table>'
+    (schema_translate_map). Foreign keys are off by default in SQLite and are switched on
+    for every connection. PostgreSQL-only indexes are skipped by their ddl_if().
+
+    ':memory:' databases live inside one connection, so that connection is shared
+    by every session (StaticPool); fine for tests, but not for concurrent writers.
+    """
+    name = 'sqlite'
+
+    def __init__(self, url: str):
+        database = make_url(url).database
+        self.in_memory = database in (None, '', ':memory:')
+
+    def engine_options(self, config: DatabaseConfig) -> Dict[str, Any]:
+        if self.in_memory:
+            options = {'echo': config.echo, 'poolclass': StaticPool}
+        else:
+            options = super().engine_options(config)
+            # seconds to wait for another connection's write lock
+            options['connect_args'] = {'timeout': config.pool_timeout}
+
+        # pooled connections are handed to whichever thread checks them out
+        options.setdefault('connect_args', {})['check_same_thread'] = False
+        options['execution_options'] = {'schema_translate_map': {SCHEMA: None}}
+        return options
+
+    def configure(self, engine: Engine) -> None:
+        @event.listens_for(engine, 'connect')
+        def _enable_foreign_keys(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.close()
+
+    def defer_constraints(self, session: Session) -> None:
+        # No SET CONSTRAINTS in SQLite. Not needed either: memberships.member_id is
+        # nullable, so membership -> member -> membership.member_id is valid at every step.
+        pass
+
+    def reset_schema(self, engine: Engine) -> None:
+        with engine.connect() as conn:
+            # the member <-> membership cycle can't be dropped in FK order,
+            # so switch the checks off and drop table by table
+            conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            for table in Base.metadata.tables.values():
+                table.drop(conn, checkfirst=True)
+            conn.commit()
+            conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+
+
+def backend_for(url: str) -> Backend:
+    """Pick the backend for a database URL."""
+    dialect = make_url(url).get_backend_name()
+    if dialect == 'postgresql':
+        return PostgresBackend()
+    if dialect == 'sqlite':
+        return SQLiteBackend(url)
+    raise ValueError(f"Unsupported database: {dialect} (use postgresql:// or sqlite://)")
@@ -0,0 +1,7 @@
+"""
+Benchmarks and load harnesses for the Library Management System.
+
+Run them from the LibraryMgtSys folder so the flat imports resolve, e.g.:
+    python -m benchmarks.stress_borrow --threads 32
+They talk to the database configured in DatabaseManager.
+"""
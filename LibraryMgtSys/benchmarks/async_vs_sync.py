@@ -0,0 +1,121 @@
+"""
+Sync DatabaseManager vs. AsyncDatabaseManager under many concurrent borrowers.
+
+N borrowers (default 500) each run borrow_item -> return_item in a loop
+against a small set of items:
+- sync:  one thread per borrower (ThreadPoolExecutor), sharing the sync engine's pool
+- async: one task per borrower (asyncio.gather), sharing the async engine's pool
+Both pools get the same size, so the difference is threads vs. the event loop.
+
+Reports completed operations (borrow + return attempts) per second and latency percentiles.
+
+Requires asyncpg. Usage (from the LibraryMgtSys folder):
+    python -m benchmarks.async_vs_sync --borrowers 500 --items 50 --rounds 5
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import update
+
+from async_database_manager import AsyncDatabaseManager
+from database_manager import DatabaseManager
+from models import LibraryItemModel
+from benchmarks.data_generator import seed_items, seed_members
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(label: str, latencies_ms: list, elapsed: float) -> None:
+    print(f"{label:<8} {len(latencies_ms):>8} ops  {len(latencies_ms) / elapsed:>10.1f} ops/s  "
+          f"p50 {statistics.median(latencies_ms):>7.2f} ms  p99 {percentile(latencies_ms, 99):>8.2f} ms")
+
+
+def run_sync(db: DatabaseManager, member_ids: list, item_ids: list, rounds: int) -> tuple:
+    def borrower(index: int) -> list:
+        member_id = member_ids[index]
+        item_id = item_ids[index % len(item_ids)]
+        latencies = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            if db.borrow_item(member_id, item_id):
+                db.return_item(member_id, item_id)
+            latencies.append((time.perf_counter() - start) * 1000)
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(member_ids)) as pool:
+        results = list(pool.map(borrower, range(len(member_ids))))
+    elapsed = time.perf_counter() - start
+    return [ms for latencies in results for ms in latencies], elapsed
+
+
+async def run_async(db: AsyncDatabaseManager, member_ids: list, item_ids: list, rounds: int) -> tuple:
+    async def borrower(index: int) -> list:
+        member_id = member_ids[index]
+        item_id = item_ids[index % len(item_ids)]
+        latencies = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            if await db.borrow_item(member_id, item_id):
+                await db.return_item(member_id, item_id)
+            latencies.append((time.perf_counter() - start) * 1000)
+        return latencies
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(borrower(i) for i in range(len(member_ids))))
+    elapsed = time.perf_counter() - start
+    return [ms for latencies in results for ms in latencies], elapsed
+
+
+async def async_phase(member_ids: list, item_ids: list, rounds: int, config) -> tuple:
+    adb = AsyncDatabaseManager(config)
+    try:
+        # warm the pool so connection setup isn't part of the measurement
+        await asyncio.gather(*(adb.count_active_borrows(m) for m in member_ids[:config.pool_size]))
+        return await run_async(adb, member_ids, item_ids, rounds)
+    finally:
+        await adb.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent borrowers: threads + sync engine vs. asyncio + asyncpg")
+    parser.add_argument('--borrowers', type=int, default=500)
+    parser.add_argument('--items', type=int, default=50)
+    parser.add_argument('--copies', type=int, default=5, help="copies per item")
+    parser.add_argument('--rounds', type=int, default=5, help="borrow/return cycles per borrower")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    db.create_tables()
+
+    run_id = uuid.uuid4().hex[:8]
+    item_ids = seed_items(db, args.items, run_id)
+    # same number of copies everywhere, so both runs see the same contention
+    with db.get_session() as session:
+        session.execute(
+            update(LibraryItemModel).where(LibraryItemModel.id.in_(item_ids))
+            .values(total_copies=args.copies, available_copies=args.copies)
+        )
+    member_ids = seed_members(db, args.borrowers, run_id)
+
+    print("=" * 70)
+    print(f"ASYNC VS SYNC: {args.borrowers} borrowers, {args.items} items x {args.copies} copies, "
+          f"{args.rounds} rounds, pool {db.config.pool_size}+{db.config.max_overflow}")
+    print("=" * 70)
+
+    sync_latencies, sync_elapsed = run_sync(db, member_ids, item_ids, args.rounds)
+    summarize('sync', sync_latencies, sync_elapsed)
+
+    async_latencies, async_elapsed = asyncio.run(async_phase(member_ids, item_ids, args.rounds, db.config))
+    summarize('async', async_latencies, async_elapsed)
+
+
+if __name__ == "__main__":
+    main()
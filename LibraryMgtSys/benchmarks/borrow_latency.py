@@ -0,0 +1,91 @@
+"""
+Borrow latency vs. member history depth.
+
+For each history depth, a fresh member gets that many *returned* loans,
+then borrow_item + return_item are timed. With the COUNT over the partial
+index the borrow latency should stay flat; the old relationship scan
+(load member.borrowed_items, filter in Python) is timed alongside for contrast.
+
+Usage (from the LibraryMgtSys folder):
+    python -m benchmarks.borrow_latency --depths 0 1000 10000 50000 --repeat 50
+"""
+import argparse
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from database_manager import DatabaseManager
+from models import BorrowedItemModel, MemberModel
+
+
+def seed_history(db: DatabaseManager, member_id: int, item_id: int, depth: int, chunk_size: int = 5000) -> None:
+    """Insert `depth` returned loans for the member with multi-row INSERTs."""
+    now = datetime.now()
+    for start in range(0, depth, chunk_size):
+        rows = [
+            {
+                'member_id': member_id,
+                'item_id': item_id,
+                'borrow_date': now - timedelta(days=30, minutes=i),
+                'return_date': now - timedelta(days=20, minutes=i),
+                'status': 'returned'
+            }
+            for i in range(start, min(start + chunk_size, depth))
+        ]
+        with db.get_session() as session:
+            session.execute(insert(BorrowedItemModel), rows)
+
+
+def time_ms(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def relationship_scan_count(db: DatabaseManager, member_id: int) -> int:
+    """The pre-index approach: lazy-load the whole history and filter in Python."""
+    with db.get_session() as session:
+        member = session.get(MemberModel, member_id)
+        return len([b for b in member.borrowed_items if b.status == 'borrowed'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Borrow latency as borrow history grows")
+    parser.add_argument('--depths', type=int, nargs='+', default=[0, 1000, 10000, 50000])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    db.create_tables()
+    run_id = uuid.uuid4().hex[:8]
+
+    print("=" * 70)
+    print("BORROW LATENCY VS HISTORY DEPTH (ms)")
+    print("=" * 70)
+    print(f"{'depth':>8} {'borrow p50':>12} {'borrow p95':>12} {'count p50':>12} {'old scan p50':>14}")
+
+    for depth in args.depths:
+        member = db.add_member(f"History {depth}", f"history-{run_id}-{depth}@example.com", 'regular', 3)
+        filler = db.add_book(f"Filler {depth} {run_id}", "Bench", 1, f"fill-{run_id}-{depth}", 10)
+        target = db.add_book(f"Target {depth} {run_id}", "Bench", 1, f"tgt-{run_id}-{depth}", 10)
+        seed_history(db, member.id, filler.id, depth)
+
+        borrow_ms, count_ms, scan_ms = [], [], []
+        for _ in range(args.repeat):
+            borrow_ms.append(time_ms(lambda: db.borrow_item(member.id, target.id)))
+            db.return_item(member.id, target.id)
+            count_ms.append(time_ms(lambda: db.count_active_borrows(member.id)))
+        # the old path is much slower at depth, so sample it less
+        for _ in range(max(1, args.repeat // 10)):
+            scan_ms.append(time_ms(lambda: relationship_scan_count(db, member.id)))
+
+        p95 = statistics.quantiles(borrow_ms, n=20)[-1] if len(borrow_ms) > 1 else borrow_ms[0]
+        print(f"{depth:>8} {statistics.median(borrow_ms):>12.2f} {p95:>12.2f} "
+              f"{statistics.median(count_ms):>12.2f} {statistics.median(scan_ms):>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""
+Circulation benchmark suite: latency, throughput and SQL cost of the Library API.
+
+Seeds a synthetic library (benchmarks.data_generator.generate) and runs scenarios
+through the same calls the application makes:
+    storm          borrow_item -> return_item on a small set of hot items
+    checkout       borrow_items of 3-5 items at once, then return_item for each
+    search         search_items / search_catalog mix, including typos
+    waitlist       hot item runs out, members queue for it,
+                   returns put the copy on hold for the next in line
+    notifications  inbox page, unread count, mark all read
+
+For every operation it reports p50 / p95 / p99 latency, ops/sec and SQL statements
+per call (counted with a before_cursor_execute listener; a cache hit counts 0).
+--json writes the results, --baseline compares against an earlier JSON file,
+so two commits can be compared run by run.
+
+Usage (from the LibraryMgtSys folder):
+    python -m benchmarks.circulation --items 5000 --members 2000 --ops 2000 --json after.json
+    python -m benchmarks.circulation --scenarios storm search --threads 8 --baseline before.json
+    LIBRARY_DATABASE_URL=sqlite:// python -m benchmarks.circulation   # no server needed
+"""
+import argparse
+import json
+import random
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from sqlalchemy import event
+
+from database_manager import DatabaseManager
+from library_integrated import Library
+from benchmarks.data_generator import DatasetSpec, Dataset, generate, WORDS, AUTHORS
+
+
+# ========================
+# MEASUREMENT
+# ========================
+def percentile(samples: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of an unsorted list."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class Recorder:
+    """
+    Collects (latency, statement count) per operation name.
+    Statements are counted per thread, so concurrent workers don't mix their counts.
+    """
+
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statements: Dict[str, int] = defaultdict(int)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self._local.statements = getattr(self._local, 'statements', 0) + 1
+
+    def __enter__(self):
+        event.listen(self.db.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.db.engine, 'before_cursor_execute', self._on_execute)
+
+    def measure(self, name: str, call: Callable):
+        """Run call(), record its wall time and the statements it sent."""
+        self._local.statements = 0
+        start = time.perf_counter()
+        result = call()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.latencies[name].append(elapsed_ms)
+            self.statements[name] += self._local.statements
+        return result
+
+    def summary(self, elapsed_s: float) -> dict:
+        ops = {}
+        for name, samples in sorted(self.latencies.items()):
+            ops[name] = {
+                'count': len(samples),
+                'p50_ms': round(percentile(samples, 50), 3),
+                'p95_ms': round(percentile(samples, 95), 3),
+                'p99_ms': round(percentile(samples, 99), 3),
+                'mean_ms': round(sum(samples) / len(samples), 3),
+                'statements_per_op': round(self.statements[name] / len(samples), 2)
+            }
+        total = sum(op['count'] for op in ops.values())
+        return {
+            'elapsed_s': round(elapsed_s, 3),
+            'total_ops': total,
+            'ops_per_s': round(total / elapsed_s, 1) if elapsed_s else 0.0,
+            'ops': ops
+        }
+
+
+# ========================
+# SCENARIOS
+# ========================
+# each scenario is a worker: (library, recorder, dataset, rng, op_count) -> None;
+# run_scenario gives every thread its own rng and share of op_count
+
+def storm_worker(library: Library, rec: Recorder, data: Dataset, rng: random.Random, op_count: int) -> None:
+    """Borrow a hot item and give it back straight away."""
+    hot_items = data.item_ids[:max(1, len(data.item_ids) // 100)]
+    for _ in range(op_count // 2):
+        member_id = rng.choice(data.member_ids)
+        item_id = rng.choice(hot_items)
+        if rec.measure('borrow_item', lambda: library.borrow_item(member_id, item_id)):
+            rec.measure('return_item', lambda: library.return_item(member_id, item_id))
+
+
+def checkout_worker(library: Library, rec: Recorder, data: Dataset, rng: random.Random, op_count: int) -> None:
+    """Desk checkout of 3-5 items in one borrow_items call, then return them one by one."""
+    for _ in range(op_count // 4):
+        member_id = rng.choice(data.member_ids)
+        basket = rng.sample(data.item_ids, min(len(data.item_ids), rng.randint(3, 5)))
+        outcomes = rec.measure('borrow_items', lambda: library.borrow_items(member_id, basket))
+        for outcome in outcomes:
+            if outcome.borrowed:
+                rec.measure('return_item', lambda: library.return_item(member_id, outcome.item_id))
+
+
+def _typo(word: str, rng: random.Random) -> str:
+    position = rng.randrange(len(word))
+    return word[:position] + word[position + 1:]
+
+
+def search_worker(library: Library, rec: Recorder, data: Dataset, rng: random.Random, op_count: int) -> None:
+    """60% substring search, 40% ranked catalog search (a quarter of those misspelled)."""
+    for _ in range(op_count):
+        roll = rng.random()
+        if roll < 0.6:
+            term = rng.choice(WORDS + [a.split()[-1] for a in AUTHORS])
+            rec.measure('search_items', lambda: library.search_items(term))
+        else:
+            term = " ".join(rng.sample(WORDS, 2))
+            if roll > 0.9:
+                term = _typo(term, rng)
+            rec.measure('search_catalog', lambda: library.search_catalog(term, limit=20))
+
+
+def waitlist_worker(library: Library, rec: Recorder, data: Dataset, rng: random.Random, op_count: int) -> None:
+    """
+    Members take every copy of one item, others queue up for it;
+    then copies come back one by one, each going on hold for the head of the queue.
+    Waiters pick up their hold and return it, passing the copy down the queue.
+    """
+    item_id = rng.choice(data.item_ids)
+    copies = library.db.get_item_by_id(item_id).total_copies
+    members = rng.sample(data.member_ids, min(len(data.member_ids), copies + max(1, op_count // 3)))
+    holders, waiters = members[:copies], members[copies:]
+
+    borrowed = [m for m in holders if library.borrow_item(m, item_id)]
+    for member_id in waiters:
+        rec.measure('join_waiting_list', lambda: library.join_waiting_list(member_id, item_id))
+    rec.measure('get_waiting_list', lambda: library.get_waiting_list(item_id))
+    for member_id in borrowed:
+        rec.measure('return_item+hold', lambda: library.return_item(member_id, item_id))
+    for member_id in waiters:
+        if rec.measure('borrow_item(hold)', lambda: library.borrow_item(member_id, item_id)):
+            rec.measure('return_item+hold', lambda: library.return_item(member_id, item_id))
+        else:
+            rec.measure('leave_waiting_list', lambda: library.leave_waiting_list(member_id, item_id))
+
+
+def notifications_worker(library: Library, rec: Recorder, data: Dataset, rng: random.Random, op_count: int) -> None:
+    """Inbox reads dominate; every tenth visit clears the inbox."""
+    db = library.db
+    for n in range(op_count):
+        member_id = rng.choice(data.member_ids)
+        rec.measure('get_unread_count', lambda: db.get_unread_count(member_id))
+        rec.measure('get_notification_inbox', lambda: db.get_notification_inbox(member_id, limit=20))
+        if n % 10 == 0:
+            rec.measure('mark_all_read', lambda: db.mark_all_read(member_id))
+
+
+SCENARIOS = {
+    'storm': storm_worker,
+    'checkout': checkout_worker,
+    'search': search_worker,
+    'waitlist': waitlist_worker,
+    'notifications': notifications_worker,
+}
+
+
+def run_scenario(library: Library, worker: Callable, data: Dataset, ops: int, threads: int, seed: int) -> dict:
+    with Recorder(library.db) as rec:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            futures = [
+                pool.submit(worker, library, rec, data, random.Random(seed + t), ops // threads)
+                for t in range(threads)
+            ]
+            for future in futures:
+                future.result()
+        elapsed = time.perf_counter() - start
+    return rec.summary(elapsed)
+
+
+# ========================
+# REPORTING
+# ========================
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_results(results: dict, baseline: dict = None) -> None:
+    for name, scenario in results['scenarios'].items():
+        print(f"\n--- {name}: {scenario['total_ops']} ops in {scenario['elapsed_s']} s "
+              f"({scenario['ops_per_s']} ops/s) ---")
+        print(f"{'operation':<24} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'stmts/op':>9}")
+        for op, stats in scenario['ops'].items():
+            line = (f"{op:<24} {stats['count']:>7} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+                    f"{stats['p99_ms']:>9.2f} {stats['statements_per_op']:>9.2f}")
+            before = (baseline or {}).get('scenarios', {}).get(name, {}).get('ops', {}).get(op)
+            if before and before['p95_ms']:
+                change = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100
+                line += f"   p95 {change:+.0f}% vs {baseline['meta']['commit']}"
+                if stats['statements_per_op'] != before['statements_per_op']:
+                    line += f", stmts {before['statements_per_op']} -> {stats['statements_per_op']}"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency / throughput / SQL-cost benchmarks for Library operations")
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--items', type=int, default=DatasetSpec.items)
+    parser.add_argument('--members', type=int, default=DatasetSpec.members)
+    parser.add_argument('--copies', type=int, default=DatasetSpec.copies)
+    parser.add_argument('--history', type=int, default=DatasetSpec.loans_per_member, help="returned loans per member")
+    parser.add_argument('--notifications', type=int, default=DatasetSpec.notifications_per_member)
+    parser.add_argument('--ops', type=int, default=1000, help="operations per scenario")
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=DatasetSpec.seed)
+    parser.add_argument('--json', help="write results to this file")
+    parser.add_argument('--baseline', help="compare against a previous --json file")
+    args = parser.parse_args()
+
+    library = Library()
+    db = library.db
+    db.create_tables()
+
+    threads = args.threads
+    if threads > 1 and getattr(db.backend, 'in_memory', False):
+        # one shared connection (StaticPool) must not be used from several threads
+        print("In-memory SQLite: running single-threaded.")
+        threads = 1
+
+    spec = DatasetSpec(items=args.items, members=args.members, copies=args.copies,
+                       loans_per_member=args.history, notifications_per_member=args.notifications, seed=args.seed)
+
+    print("=" * 70)
+    print(f"CIRCULATION BENCHMARK on {db.engine.dialect.name}: {spec.items} items, {spec.members} members, "
+          f"history {spec.loans_per_member}, {args.ops} ops x {threads} thread(s)")
+    print("=" * 70)
+
+    start = time.perf_counter()
+    data = generate(db, spec)
+    print(f"Seeded in {time.perf_counter() - start:.1f} s")
+
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'database': db.engine.dialect.name,
+            'threads': threads,
+            'ops': args.ops,
+            'dataset': spec.as_dict()
+        },
+        'scenarios': {}
+    }
+    for name in args.scenarios:
+        results['scenarios'][name] = run_scenario(library, SCENARIOS[name], data, args.ops, threads, args.seed)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+    print_results(results, baseline)
+
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump(results, fh, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
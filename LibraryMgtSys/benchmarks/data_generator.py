@@ -0,0 +1,196 @@
+"""
+Synthetic data for benchmarks and plan checks.
+
+Everything is inserted with multi-row INSERTs (SQLAlchemy insertmanyvalues),
+chunk_size rows per statement, so seeding hundreds of thousands of rows
+takes seconds rather than the hours the one-row-per-transaction API would.
+"""
+import random
+import uuid
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timedelta
+from typing import List
+
+from sqlalchemy import insert, update, select
+
+from database_manager import DatabaseManager
+from models import (
+    LibraryItemModel, BookModel, MembershipModel, MemberModel, BorrowedItemModel, WaitingListModel, NotificationModel
+)
+
+WORDS = [
+    "shadow", "river", "empire", "garden", "silent", "winter", "crimson", "ocean", "forgotten",
+    "kingdom", "machine", "python", "journey", "midnight", "secret", "glass", "iron", "wild",
+    "dream", "stone", "harbor", "mountain", "clockwork", "library", "storm", "paper", "echo"
+]
+AUTHORS = [
+    "Ada Lovelace", "Alan Turing", "Grace Hopper", "Octavia Butler", "Ursula Le Guin",
+    "Terry Pratchett", "Toni Morrison", "Haruki Murakami", "Jane Austen", "Isaac Asimov"
+]
+
+
+def _chunks(rows: list, chunk_size: int):
+    for start in range(0, len(rows), chunk_size):
+        yield rows[start:start + chunk_size]
+
+
+def synthetic_books(count: int, run_id: str, seed: int = 42):
+    """Generator of book rows for DatabaseManager.add_books_bulk."""
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {
+            'title': " ".join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(2, 4))),
+            'author': rng.choice(AUTHORS),
+            'copies': rng.randint(1, 5),
+            'isbn': f"{run_id}-{i}",
+            'num_pages': rng.randint(80, 900)
+        }
+
+
+def seed_items(db: DatabaseManager, count: int, run_id: str, chunk_size: int = 5000) -> List[int]:
+    """Bulk-load `count` synthetic books. Returns their ids."""
+    db.add_books_bulk(synthetic_books(count, run_id), chunk_size=chunk_size)
+    with db.get_session() as session:
+        return session.scalars(
+            select(BookModel.id).where(BookModel.isbn.like(f"{run_id}-%")).order_by(BookModel.id)
+        ).all()
+
+
+def seed_members(db: DatabaseManager, count: int, run_id: str, membership_type: str = 'regular',
+                 borrow_limit: int = 3, chunk_size: int = 5000) -> List[int]:
+    """
+    Create `count` members with memberships. Returns member ids.
+    The membership <-> member cycle is closed with a bulk UPDATE by primary key.
+    """
+    member_ids = []
+    expiry_date = (datetime.now() + timedelta(days=365)).date() if membership_type == 'premium' else None
+
+    for chunk_start in range(0, count, chunk_size):
+        chunk = range(chunk_start, min(chunk_start + chunk_size, count))
+        with db.get_session() as session:
+            membership_ids = session.scalars(
+                insert(MembershipModel).returning(MembershipModel.id, sort_by_parameter_order=True),
+                [
+                    {'membership_type': membership_type, 'borrow_limit': borrow_limit, 'expiry_date': expiry_date}
+                    for _ in chunk
+                ]
+            ).all()
+
+            ids = session.scalars(
+                insert(MemberModel).returning(MemberModel.id, sort_by_parameter_order=True),
+                [
+                    {'name': f"Member {i}", 'email': f"member-{run_id}-{i}@example.com", 'membership_id': ms_id}
+                    for i, ms_id in zip(chunk, membership_ids)
+                ]
+            ).all()
+
+            session.execute(
+                update(MembershipModel),
+                [{'id': ms_id, 'member_id': m_id} for ms_id, m_id in zip(membership_ids, ids)]
+            )
+            member_ids.extend(ids)
+
+    return member_ids
+
+
+def seed_loan_history(db: DatabaseManager, member_ids: List[int], item_ids: List[int], loans_per_member: int,
+                      seed: int = 42, chunk_size: int = 5000) -> int:
+    """
+    Give every member `loans_per_member` returned loans of random items.
+    Copy counts are untouched because all the loans are closed.
+    Returns the number of rows inserted.
+    """
+    rng = random.Random(seed)
+    now = datetime.now()
+    rows = []
+    for member_id in member_ids:
+        for n in range(loans_per_member):
+            borrowed = now - timedelta(days=rng.randint(15, 3 * 365), minutes=n)
+            rows.append({
+                'member_id': member_id,
+                'item_id': rng.choice(item_ids),
+                'borrow_date': borrowed,
+                'due_date': borrowed + timedelta(days=14),
+                'return_date': borrowed + timedelta(days=rng.randint(1, 14)),
+                'status': 'returned'
+            })
+
+    for chunk in _chunks(rows, chunk_size):
+        with db.get_session() as session:
+            session.execute(insert(BorrowedItemModel), chunk)
+    return len(rows)
+
+
+def seed_waiting_list(db: DatabaseManager, item_id: int, member_ids: List[int], chunk_size: int = 5000) -> int:
+    """Put all the given members on one item's waiting list."""
+    for chunk in _chunks(member_ids, chunk_size):
+        with db.get_session() as session:
+            session.execute(insert(WaitingListModel), [{'member_id': m, 'item_id': item_id} for m in chunk])
+    return len(member_ids)
+
+
+def seed_notifications(db: DatabaseManager, member_ids: List[int], per_member: int, read_ratio: float = 0.8,
+                       seed: int = 42, chunk_size: int = 5000) -> int:
+    """Give every member `per_member` notifications, most of them already read."""
+    rng = random.Random(seed)
+    now = datetime.now()
+    rows = [
+        {
+            'member_id': member_id,
+            'message': f"Synthetic notification {n}",
+            'is_read': rng.random() < read_ratio,
+            'created_at': now - timedelta(minutes=rng.randint(1, 500000))
+        }
+        for member_id in member_ids
+        for n in range(per_member)
+    ]
+    for chunk in _chunks(rows, chunk_size):
+        with db.get_session() as session:
+            session.execute(insert(NotificationModel), chunk)
+    return len(rows)
+
+
+# ========================
+# WHOLE DATASETS
+# ========================
+@dataclass
+class DatasetSpec:
+    """Size and shape of a synthetic library."""
+    items: int = 1000
+    members: int = 500
+    copies: int = 3                 # copies of every item
+    loans_per_member: int = 10      # returned loans each member already has (history depth)
+    notifications_per_member: int = 5
+    seed: int = 42
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class Dataset:
+    """Ids of what generate() created."""
+    run_id: str
+    item_ids: List[int] = field(default_factory=list)
+    member_ids: List[int] = field(default_factory=list)
+
+
+def generate(db: DatabaseManager, spec: DatasetSpec) -> Dataset:
+    """Seed items, members, loan history and notifications as described by spec."""
+    dataset = Dataset(run_id=uuid.uuid4().hex[:8])
+    dataset.item_ids = seed_items(db, spec.items, dataset.run_id)
+
+    # same number of copies everywhere, so contention only depends on the workload
+    with db.get_session() as session:
+        for chunk in _chunks(dataset.item_ids, 5000):
+            session.execute(
+                update(LibraryItemModel).where(LibraryItemModel.id.in_(chunk))
+                .values(total_copies=spec.copies, available_copies=spec.copies)
+            )
+    dataset.member_ids = seed_members(db, spec.members, dataset.run_id)
+    seed_loan_history(db, dataset.member_ids, dataset.item_ids, spec.loans_per_member, seed=spec.seed)
+    seed_notifications(db, dataset.member_ids, spec.notifications_per_member, seed=spec.seed)
+    # the rows above were written around DatabaseManager's counters
+    db.reconcile_stats()
+    return dataset
+
@@ -0,0 +1,71 @@
+"""
+Waiting-list notification fan-out at scale.
+
+Seeds one item with N waiting members (default 10,000) and compares:
+- set-based: DatabaseManager.notify_waiting_members (one INSERT ... SELECT)
+- per-row ORM: load every waiting_list row and session.add() one NotificationModel each
+  (the previous implementation)
+
+Usage (from the LibraryMgtSys folder):
+    python -m benchmarks.notify_fanout --waiters 10000
+"""
+import argparse
+import time
+import uuid
+
+from sqlalchemy import delete
+
+from database_manager import DatabaseManager
+from models import WaitingListModel, NotificationModel, LibraryItemModel
+from benchmarks.data_generator import seed_members, seed_waiting_list
+
+
+def per_row_fanout(db: DatabaseManager, item_id: int) -> int:
+    """The previous approach: one ORM object per waiting member."""
+    with db.get_session() as session:
+        item = session.get(LibraryItemModel, item_id)
+        waitings = session.query(WaitingListModel).filter(WaitingListModel.item_id == item_id).all()
+        for record in waitings:
+            session.add(NotificationModel(member_id=record.member_id, message=f"'{item.title}' is now available"))
+        return len(waitings)
+
+
+def clear_notifications(db: DatabaseManager, member_ids: list) -> None:
+    with db.get_session() as session:
+        session.execute(delete(NotificationModel).where(NotificationModel.member_id.in_(member_ids)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Waiting-list notification fan-out benchmark")
+    parser.add_argument('--waiters', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    db.create_tables()
+    run_id = uuid.uuid4().hex[:8]
+
+    book = db.add_book(f"Popular {run_id}", "Bench", 1, f"pop-{run_id}", 10)
+    member_ids = seed_members(db, args.waiters, run_id)
+    seed_waiting_list(db, book.id, member_ids)
+
+    print("=" * 70)
+    print(f"NOTIFICATION FAN-OUT: {args.waiters} waiters")
+    print("=" * 70)
+
+    for name, fanout in (("set-based INSERT ... SELECT", db.notify_waiting_members),
+                         ("per-row ORM inserts", lambda item_id: per_row_fanout(db, item_id))):
+        timings = []
+        for _ in range(args.repeat):
+            clear_notifications(db, member_ids)
+            start = time.perf_counter()
+            created = fanout(book.id)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        print(f"{name:<30} {created:>8} rows  best {best * 1000:>9.1f} ms  {created / best:>12.0f} rows/s")
+
+    clear_notifications(db, member_ids)
+
+
+if __name__ == "__main__":
+    main()
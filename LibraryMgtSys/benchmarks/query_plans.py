@@ -0,0 +1,240 @@
+"""
+Query-plan regression check for DatabaseManager (PostgreSQL only).
+
+1. Seeds a large synthetic dataset (items, members, loan history,
+   notifications, a long waiting list).
+2. Calls every DatabaseManager query method inside a batch that is rolled back,
+   capturing the SQL it sends (executemany batches too, explained with their first row).
+3. Runs EXPLAIN (ANALYZE, FORMAT JSON) for each captured statement
+   (in a rolled-back transaction, so writes leave no trace).
+4. Fails if a statement sequentially scans a table, unless the method
+   is a full scan by design, or if its execution time is over the budget.
+
+Exit code 0 = all plans OK, 1 = regression found.
+The same checks run as pytest tests in tests/test_query_plans.py
+when LIBRARY_DATABASE_URL points at PostgreSQL.
+
+Usage (from the LibraryMgtSys folder):
+    python -m benchmarks.query_plans --items 200000 --members 20000 --budget-ms 50
+    python -m benchmarks.query_plans --skip-seed      # reuse the data from a previous run
+"""
+import argparse
+import inspect
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, select, func, text
+
+from database_manager import DatabaseManager
+from models import LibraryItemModel, MemberModel, WaitingListModel
+from benchmarks.data_generator import (
+    seed_items, seed_members, seed_loan_history, seed_waiting_list, seed_notifications, synthetic_books
+)
+
+# tables that grow with the data; catalog_stats is left out: it has a fixed
+# number of rows, so scanning it is as cheap as reading it by key
+TABLES = ['library_items', 'books', 'dvds', 'members', 'memberships',
+          'borrowed_items', 'borrowed_items_archive', 'waiting_list', 'notifications', 'item_cooccurrence']
+SQL_VERBS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+
+class _Rollback(Exception):
+    """Raised at the end of a captured call so its batch rolls back."""
+
+
+def seed(db: DatabaseManager, items: int, members: int, loans_per_member: int, waiters: int) -> None:
+    run_id = uuid.uuid4().hex[:8]
+    print(f"Seeding {items} items, {members} members, {members * loans_per_member} loans ...")
+    item_ids = seed_items(db, items, run_id)
+    member_ids = seed_members(db, members, run_id)
+    seed_loan_history(db, member_ids, item_ids, loans_per_member)
+    # loans returned over a year ago live in the archive, as in production
+    db.archive_returned_loans(older_than_days=365)
+    db.rebuild_cooccurrence()
+    seed_notifications(db, member_ids, per_member=10)
+    seed_waiting_list(db, item_ids[0], member_ids[:waiters])
+    db.reconcile_stats()
+
+    with db.engine.begin() as conn:
+        for table in TABLES:
+            conn.execute(text(f"ANALYZE librarymgtsys.{table}"))
+
+
+def pick_fixture(db: DatabaseManager) -> dict:
+    """Ids to call the methods with: the busiest waiting list, a member on it, a fresh borrower."""
+    with db.get_session() as session:
+        hot_item = session.execute(
+            select(WaitingListModel.item_id)
+            .group_by(WaitingListModel.item_id)
+            .order_by(func.count().desc())
+            .limit(1)
+        ).scalar()
+        waiter = session.scalar(select(WaitingListModel.member_id).where(WaitingListModel.item_id == hot_item).limit(1))
+        member = session.scalar(select(func.max(MemberModel.id)))
+        item = session.scalar(
+            select(LibraryItemModel.id).where(LibraryItemModel.available_copies > 0).order_by(LibraryItemModel.id.desc()).limit(1)
+        )
+    return {'hot_item': hot_item, 'waiter': waiter, 'member': member, 'item': item}
+
+
+def method_checks(db: DatabaseManager, f: dict) -> list:
+    """
+    (name, call, full_scan_ok) for every query method.
+    Cached reads call their loaders directly so the query actually runs.
+    """
+    return [
+        ('get_item_by_id',            lambda: db.get_item_by_id(f['item']), False),
+        ('get_item_snapshot',         lambda: db._load_item_snapshot(f['item']), False),
+        ('search_items',              lambda: db.search_items('winter'), False),
+        ('search_catalog',            lambda: db.search_catalog('kingdon midnight'), False),
+        ('iter_items(page)',          lambda: db.iter_items(after_id=f['item'] - 100, limit=50), False),
+        ('count_items',               lambda: db.count_items(), True),
+        ('stats',                     lambda: db.stats(), False),
+        ('reconcile_stats',           lambda: db.reconcile_stats(), True),
+        ('get_member_by_id',          lambda: db.get_member_by_id(f['member']), False),
+        ('get_member_profile',        lambda: db.get_member_profile(f['waiter']), False),
+        ('iter_members(page)',        lambda: db.iter_members(after_id=f['member'] - 100, limit=50), False),
+        ('get_membership',            lambda: db.get_membership(f['member']), False),
+        ('check_membership_expiry',   lambda: db.check_membership_expiry(f['member']), False),
+        ('add_books_bulk',            lambda: db.add_books_bulk(synthetic_books(100, uuid.uuid4().hex[:8])), False),
+        ('can_borrow',                lambda: db.can_borrow(f['member']), False),
+        ('expire_memberships',        lambda: db.expire_memberships(), False),
+        ('send_expiry_warnings',      lambda: db.send_expiry_warnings(), False),
+        ('count_active_borrows',      lambda: db.count_active_borrows(f['member']), False),
+        ('borrow_item',               lambda: db.borrow_item(f['member'], f['item']), False),
+        ('borrow_items',              lambda: db.borrow_items(f['member'], [f['item'], f['item'] - 1]), False),
+        ('return_item',               lambda: db.return_item(f['member'], f['item']), False),
+        ('get_member_borrowed_items', lambda: db.get_member_borrowed_items(f['member']), False),
+        ('get_item_borrow_history',   lambda: db.get_item_borrow_history(f['hot_item']), False),
+        ('get_item_history_page',     lambda: db.get_item_borrow_history_page(f['hot_item']), False),
+        ('iter_borrow_history(page)', lambda: db.iter_borrow_history(f['hot_item'], limit=50), False),
+        ('get_member_history_page',   lambda: db.get_member_borrow_history_page(f['member']), False),
+        ('iter_circulation',          lambda: db.iter_circulation(since=datetime.now() - timedelta(days=30)), True),
+        ('archive_returned_loans',    lambda: db.archive_returned_loans(chunk_size=500), True),
+        ('get_related_items',         lambda: db.get_related_items(f['hot_item']), False),
+        ('send_due_reminders',        lambda: db.send_due_reminders(), False),
+        ('join_waiting_list',         lambda: db.join_waiting_list(f['member'], f['hot_item']), False),
+        ('leave_waiting_list',        lambda: db.leave_waiting_list(f['waiter'], f['hot_item']), False),
+        ('get_waiting_list',          lambda: db.get_waiting_list(f['hot_item']), False),
+        ('expire_holds',              lambda: db.expire_holds(), False),
+        ('notify_waiting_members',    lambda: db.notify_waiting_members(f['hot_item']), False),
+        ('get_member_notifications',  lambda: db.get_member_notifications(f['member']), False),
+        ('get_notification_inbox',    lambda: db.get_notification_inbox(f['member'], unread_only=True), False),
+        ('get_unread_count',          lambda: db._load_unread_count(f['member']), False),
+        ('mark_all_read',             lambda: db.mark_all_read(f['member']), False),
+    ]
+
+
+def capture_statements(db: DatabaseManager, call) -> list:
+    """
+    Run call() in a batch that is rolled back; return the (sql, params) it executed.
+    An executemany (a list of parameter sets) is returned once, with its first set,
+    and so is a statement sent again with other parameters (e.g. insertmanyvalues batches).
+    """
+    captured = []
+    seen = set()
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip().split(None, 1)[0].upper()
+        if verb not in SQL_VERBS or statement in seen:
+            return
+        if executemany and isinstance(parameters, list):
+            parameters = parameters[0]
+        seen.add(statement)
+        captured.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        with db.batch():
+            result = call()
+            if inspect.isgenerator(result):
+                list(result)
+            raise _Rollback()
+    except _Rollback:
+        pass
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    return captured
+
+
+def explain(db: DatabaseManager, statement: str, parameters) -> dict:
+    """EXPLAIN (ANALYZE, FORMAT JSON) one statement and roll back whatever it did."""
+    with db.engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            return conn.exec_driver_sql("EXPLAIN (ANALYZE, FORMAT JSON) " + statement, parameters).scalar()[0]
+        finally:
+            trans.rollback()
+
+
+def seq_scans(plan_node: dict) -> list:
+    """All tables read with a Seq Scan anywhere in the plan tree."""
+    found = []
+    if plan_node.get('Node Type') == 'Seq Scan':
+        found.append(plan_node.get('Relation Name'))
+    for child in plan_node.get('Plans', []):
+        found.extend(seq_scans(child))
+    return found
+
+
+def plan_problems(db: DatabaseManager, statement: str, parameters, full_scan_ok: bool, budget_ms: float):
+    """(execution time in ms, problems) for one captured statement; no problems = plan OK."""
+    plan = explain(db, statement, parameters)
+    elapsed = plan['Execution Time']
+    scanned = [t for t in seq_scans(plan['Plan']) if t in TABLES]
+
+    problems = []
+    if scanned and not full_scan_ok:
+        problems.append(f"seq scan on {', '.join(scanned)}")
+    if elapsed > budget_ms:
+        problems.append(f"{elapsed:.1f} ms over budget")
+    return elapsed, problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE every DatabaseManager query")
+    parser.add_argument('--items', type=int, default=200_000)
+    parser.add_argument('--members', type=int, default=20_000)
+    parser.add_argument('--loans-per-member', type=int, default=20)
+    parser.add_argument('--waiters', type=int, default=500)
+    parser.add_argument('--budget-ms', type=float, default=50.0)
+    parser.add_argument('--skip-seed', action='store_true')
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    if db.engine.dialect.name != 'postgresql':
+        print("Query plan checks need PostgreSQL.")
+        return 2
+
+    db.create_tables()
+    if not args.skip_seed:
+        seed(db, args.items, args.members, args.loans_per_member, args.waiters)
+    fixture = pick_fixture(db)
+
+    print("=" * 70)
+    print(f"QUERY PLANS (budget {args.budget_ms} ms per statement)")
+    print("=" * 70)
+
+    failures = []
+    for name, call, full_scan_ok in method_checks(db, fixture):
+        for n, (statement, parameters) in enumerate(capture_statements(db, call), start=1):
+            elapsed, problems = plan_problems(db, statement, parameters, full_scan_ok, args.budget_ms)
+            status = 'FAIL' if problems else 'ok'
+            print(f"{status:<5} {name:<28} #{n} {elapsed:>8.2f} ms  {'; '.join(problems)}")
+            if problems:
+                failures.append((name, statement, problems))
+
+    print()
+    if failures:
+        print(f"{len(failures)} statement(s) regressed:")
+        for name, statement, problems in failures:
+            print(f"\n[{name}] {'; '.join(problems)}\n{statement}")
+        return 1
+
+    print("All query plans OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,79 @@
+"""
+Detached ORM objects vs. read-only records on large reads.
+
+Seeds N items (default 100,000) and N notifications for one member, then loads
+them both ways:
+- ORM:     get_all_items() / get_member_notifications()       (full entities, expunged)
+- records: the same calls with as_records=True                (column-only SELECT, tuples)
+
+For each it reports wall time, the peak memory allocated during the call and the memory
+still held by the returned list (tracemalloc), best of --repeat runs.
+
+Usage (from the LibraryMgtSys folder):
+    python -m benchmarks.records_memory --rows 100000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+import uuid
+
+from database_manager import DatabaseManager
+from benchmarks.data_generator import seed_items, seed_members, seed_notifications
+
+
+def measure(call, repeat: int) -> dict:
+    """Best wall time and tracemalloc figures over `repeat` runs."""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = call()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        run = {'rows': len(result), 'ms': elapsed_ms, 'peak_mb': peak / 2**20, 'retained_mb': retained / 2**20}
+        del result
+        if best is None or run['ms'] < best['ms']:
+            best = run
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory / latency of ORM reads vs. record reads")
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    db.create_tables()
+    # keep the item cache out of the picture
+    db.item_cache.clear()
+
+    run_id = uuid.uuid4().hex[:8]
+    print(f"Seeding {args.rows} items and {args.rows} notifications ...")
+    seed_items(db, args.rows, run_id)
+    member_id = seed_members(db, 1, run_id)[0]
+    seed_notifications(db, [member_id], per_member=args.rows)
+
+    cases = [
+        ('get_all_items',            lambda: db.get_all_items(),
+                                     lambda: db.get_all_items(as_records=True)),
+        ('get_member_notifications', lambda: db.get_member_notifications(member_id),
+                                     lambda: db.get_member_notifications(member_id, as_records=True)),
+    ]
+
+    print("=" * 70)
+    print(f"ORM OBJECTS VS RECORDS (best of {args.repeat})")
+    print("=" * 70)
+    print(f"{'call':<26} {'mode':<8} {'rows':>8} {'time ms':>10} {'peak MB':>9} {'held MB':>9}")
+    for name, orm_call, record_call in cases:
+        for mode, call in (('orm', orm_call), ('records', record_call)):
+            r = measure(call, args.repeat)
+            print(f"{name:<26} {mode:<8} {r['rows']:>8} {r['ms']:>10.1f} {r['peak_mb']:>9.1f} {r['retained_mb']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Catalog search: ILIKE scan (search_items) vs. indexed search (search_catalog).
+
+Loads N synthetic titles (default 1,000,000) through add_books_bulk, refreshes
+planner statistics, then times a mix of queries against both paths:
+exact words, partial words, author names and typos.
+
+Usage (from the LibraryMgtSys folder):
+    python -m benchmarks.search_compare --items 1000000
+    python -m benchmarks.search_compare --skip-load      # reuse an existing catalog
+"""
+import argparse
+import statistics
+import time
+import uuid
+
+from sqlalchemy import text
+
+from database_manager import DatabaseManager
+from benchmarks.data_generator import synthetic_books
+
+QUERIES = [
+    "winter",            # single word
+    "silent ocean",      # two words
+    "clockw",            # partial word
+    "Murakami",          # author
+    "kingdon",           # typo
+    "Tolkien",           # no match
+]
+
+
+def time_query(fn, query: str, repeat: int) -> float:
+    """Median latency in ms."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ILIKE search with the indexed catalog search")
+    parser.add_argument('--items', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--skip-load', action='store_true')
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    db.create_tables()
+
+    if not args.skip_load:
+        run_id = uuid.uuid4().hex[:8]
+        start = time.perf_counter()
+        loaded, _ = db.add_books_bulk(synthetic_books(args.items, run_id), chunk_size=5000)
+        print(f"Loaded {loaded} books in {time.perf_counter() - start:.1f}s")
+        if db.engine.dialect.name == 'postgresql':
+            with db.engine.begin() as conn:
+                conn.execute(text("ANALYZE librarymgtsys.library_items"))
+
+    print("=" * 70)
+    print(f"SEARCH LATENCY, median of {args.repeat} (ms), catalog size {db.count_items()}")
+    print("=" * 70)
+    print(f"{'query':<16} {'ILIKE (all rows)':>18} {'indexed (1 page)':>18} {'hits p1':>8}")
+
+    for query in QUERIES:
+        ilike_ms = time_query(db.search_items, query, args.repeat)
+        indexed_ms = time_query(lambda q: db.search_catalog(q, limit=args.page_size), query, args.repeat)
+        hits = len(db.search_catalog(query, limit=args.page_size))
+        print(f"{query:<16} {ilike_ms:>18.1f} {indexed_ms:>18.1f} {hits:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Multi-threaded stress harness for DatabaseManager.borrow_item / return_item.
+
+Two phases against one hot item:
+1. Last-copy race: every thread borrows at the same instant (barrier),
+   exactly `copies` of them may succeed.
+2. Churn: every thread loops borrow -> return for a fixed time,
+   reporting throughput.
+3. Removed holders: every copy is returned into a hold for a waiting member,
+   then those members are deleted; the copies must come back to the shelf.
+
+After each phase the invariants are checked in the database:
+    available_copies >= 0
+    available_copies + active loans + copies on hold == total_copies
+
+Usage (from the LibraryMgtSys folder):
+    python -m benchmarks.stress_borrow --threads 32 --copies 5 --seconds 10
+"""
+import argparse
+import threading
+import time
+import uuid
+
+from sqlalchemy import select, func
+
+from database_manager import DatabaseManager
+from models import LibraryItemModel, BorrowedItemModel, WaitingListModel
+
+
+def create_fixture(db: DatabaseManager, threads: int, copies: int):
+    """Create one hot book and one regular member per thread."""
+    run_id = uuid.uuid4().hex[:8]
+    book = db.add_book(f"Hot Title {run_id}", "Stress Author", copies, f"stress-{run_id}", 100)
+    member_ids = [
+        db.add_member(f"Stress Member {i}", f"stress-{run_id}-{i}@example.com", 'regular', 3).id
+        for i in range(threads)
+    ]
+    return book.id, member_ids
+
+
+def check_invariants(db: DatabaseManager, item_id: int) -> dict:
+    """Read the item and its active loans, and verify nothing was oversold."""
+    with db.get_session() as session:
+        item = session.get(LibraryItemModel, item_id)
+        active_loans = session.scalar(
+            select(func.count(BorrowedItemModel.id)).where(
+                BorrowedItemModel.item_id == item_id,
+                BorrowedItemModel.status == 'borrowed'
+            )
+        )
+        on_hold = session.scalar(
+            select(func.count(WaitingListModel.id)).where(
+                WaitingListModel.item_id == item_id,
+                WaitingListModel.hold_expires_at.isnot(None)
+            )
+        )
+        return {
+            'total_copies': item.total_copies,
+            'available_copies': item.available_copies,
+            'active_loans': active_loans,
+            'on_hold': on_hold,
+            'oversold': item.available_copies < 0
+                        or item.available_copies + active_loans + on_hold != item.total_copies
+        }
+
+
+def last_copy_race(db: DatabaseManager, item_id: int, member_ids: list) -> int:
+    """All threads call borrow_item at once. Returns the number of winners."""
+    barrier = threading.Barrier(len(member_ids))
+    results = []
+    lock = threading.Lock()
+
+    def worker(member_id: int):
+        barrier.wait()
+        ok = db.borrow_item(member_id, item_id)
+        with lock:
+            results.append((member_id, ok))
+
+    threads = [threading.Thread(target=worker, args=(m,)) for m in member_ids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # give the copies back so phase 2 starts from a full shelf
+    for member_id, ok in results:
+        if ok:
+            db.return_item(member_id, item_id)
+
+    return sum(1 for _, ok in results if ok)
+
+
+def churn(db: DatabaseManager, item_id: int, member_ids: list, seconds: float) -> dict:
+    """Every thread loops borrow -> return until time runs out."""
+    stop_at = time.perf_counter() + seconds
+    counts = {'attempts': 0, 'borrowed': 0, 'returned': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def worker(member_id: int):
+        local = {'attempts': 0, 'borrowed': 0, 'returned': 0, 'errors': 0}
+        while time.perf_counter() < stop_at:
+            local['attempts'] += 1
+            try:
+                if db.borrow_item(member_id, item_id):
+                    local['borrowed'] += 1
+                    if db.return_item(member_id, item_id):
+                        local['returned'] += 1
+            except Exception:
+                local['errors'] += 1
+        with lock:
+            for key, value in local.items():
+                counts[key] += value
+
+    threads = [threading.Thread(target=worker, args=(m,)) for m in member_ids]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    counts['elapsed_s'] = round(elapsed, 3)
+    counts['attempts_per_s'] = round(counts['attempts'] / elapsed, 1)
+    counts['loans_per_s'] = round(counts['borrowed'] / elapsed, 1)
+    return counts
+
+
+def removed_holders(db: DatabaseManager, item_id: int, member_ids: list, copies: int) -> dict:
+    """
+    Borrow every copy, queue one new member per copy, return the copies (each goes on hold
+    for a queued member), then delete the queued members. Their held copies must be passed on
+    to the shelf, not deleted along with the waiting list rows.
+    """
+    run_id = uuid.uuid4().hex[:8]
+    waiters = [
+        db.add_member(f"Waiting Member {i}", f"waiting-{run_id}-{i}@example.com", 'regular', 3).id
+        for i in range(copies)
+    ]
+    borrowers = [m for m in member_ids[:copies] if db.borrow_item(m, item_id)]
+    for member_id in waiters:
+        db.join_waiting_list(member_id, item_id)
+    for member_id in borrowers:
+        db.return_item(member_id, item_id)
+    held = check_invariants(db, item_id)['on_hold']
+
+    for member_id in waiters:
+        db.remove_member(member_id)
+    return dict(check_invariants(db, item_id), held_before_removal=held)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hammer one hot item with concurrent borrowers")
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--copies', type=int, default=3)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    db.create_tables()
+    item_id, member_ids = create_fixture(db, args.threads, args.copies)
+
+    print("=" * 70)
+    print(f"BORROW STRESS: {args.threads} threads, {args.copies} copies, item {item_id}")
+    print("=" * 70)
+
+    winners = last_copy_race(db, item_id, member_ids)
+    expected = min(args.copies, args.threads)
+    print("\n--- Last-copy race ---")
+    print(f"Winners: {winners} (expected {expected})")
+    print(f"Invariants: {check_invariants(db, item_id)}")
+
+    stats = churn(db, item_id, member_ids, args.seconds)
+    invariants = check_invariants(db, item_id)
+    print("\n--- Borrow/return churn ---")
+    for key, value in stats.items():
+        print(f"{key}: {value}")
+    print(f"Invariants: {invariants}")
+
+    removal = removed_holders(db, item_id, member_ids, args.copies)
+    print("\n--- Removed holders ---")
+    print(f"Invariants: {removal}")
+
+    failed = winners != expected or invariants['oversold'] or removal['oversold']
+    failed = failed or removal['available_copies'] != removal['total_copies']
+    print("\n" + ("OVERSELL OR LOST COPY DETECTED!" if failed else "No oversells, no lost copies."))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,118 @@
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Hashable, Tuple
+import threading
+import time
+
+
+class Cache(ABC):
+    """
+    Pluggable read-through cache interface.
+    Subclasses only implement storage (get/set/invalidate/clear);
+    get_or_load and the hit/miss counters live here.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return (found, value)"""
+        pass
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any) -> None:
+        pass
+
+    @abstractmethod
+    def invalidate(self, key: Hashable) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+    def get_or_load(self, key: Hashable, loader: Callable[[Hashable], Any]) -> Any:
+        """
+        Read-through: return the cached value, or call loader(key) and cache the result.
+        None results are not cached (e.g. the row doesn't exist).
+        """
+        found, value = self.get(key)
+        if found:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = loader(key)
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 3) if total else 0.0
+        }
+
+
+class TTLCache(Cache):
+    """
+    In-process cache where every entry expires ttl_seconds after it was stored.
+    Thread-safe. When max_size is reached the oldest entry is dropped.
+    """
+
+    def __init__(self, ttl_seconds: float = 5.0, max_size: int = 10000):
+        super().__init__()
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._data[key]
+                return False, None
+            return True, value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.max_size:
+                # dicts keep insertion order, so the first key is the oldest
+                self._data.pop(next(iter(self._data)))
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats['size'] = len(self._data)
+        return stats
+
+
+class NullCache(Cache):
+    """Cache that never stores anything: every read goes to the database."""
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        return False, None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        pass
+
+    def invalidate(self, key: Hashable) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
@@ -0,0 +1,259 @@
+"""
+Opt-in SQL instrumentation for DatabaseManager.
+
+Per public DatabaseManager method it records:
+    calls, errors, wall time (total / max), SQL statements sent, rows (driver rowcount)
+and logs every statement slower than slow_query_ms to the 'librarymgtsys.sql' logger.
+
+Statements are seen through the engine's before/after_cursor_execute events and charged
+to every instrumented method running in the same thread, so a method's numbers include
+the public methods it calls. Generator methods (iter_*) are measured while they are
+being iterated, which is when their queries run.
+
+Enable with DatabaseConfig(instrument=True, slow_query_ms=50)
+(or LIBRARY_DB_INSTRUMENT=1 / LIBRARY_DB_SLOW_QUERY_MS=50), or by hand:
+    stats = Instrumentation(db, slow_query_ms=50).install()
+    ...
+    stats.snapshot()        # dict, e.g. for a JSON endpoint
+    stats.to_prometheus()   # text exposition format for a /metrics endpoint
+
+Rows come from cursor.rowcount: rows affected by INSERT / UPDATE / DELETE, and rows
+returned by SELECT on drivers that report it (psycopg2 does; sqlite3 and
+server-side cursors report -1, which counts as 0).
+"""
+import functools
+import inspect
+import logging
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger('librarymgtsys.sql')
+
+# not worth measuring: context managers / plumbing, not database work
+EXCLUDED_METHODS = {'get_session', 'batch', 'pool_status'}
+
+
+class MethodStats:
+    """Counters for one method."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.statements = 0
+        self.rows = 0
+        self.slow_queries = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'total_ms': round(self.total_s * 1000, 3),
+            'avg_ms': round(self.total_s / self.calls * 1000, 3) if self.calls else 0.0,
+            'max_ms': round(self.max_s * 1000, 3),
+            'statements': self.statements,
+            'statements_per_call': round(self.statements / self.calls, 2) if self.calls else 0.0,
+            'rows': self.rows,
+            'slow_queries': self.slow_queries
+        }
+
+
+class _Call:
+    """One running method call; collects the statements it causes."""
+    __slots__ = ('name', 'statements', 'rows', 'slow_queries', 'elapsed_s')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.statements = 0
+        self.rows = 0
+        self.slow_queries = 0
+        self.elapsed_s = 0.0
+
+
+class Instrumentation:
+    """
+    Wraps a DatabaseManager's public methods and listens to its engine.
+    install() / uninstall() can be called at any time; stats survive until reset().
+    """
+
+    def __init__(self, db, slow_query_ms: Optional[float] = None):
+        self.db = db
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats: Dict[str, MethodStats] = {}
+        self._wrapped: List[str] = []
+
+    # ========================
+    # INSTALL
+    # ========================
+    def install(self) -> 'Instrumentation':
+        if self._wrapped:
+            return self
+
+        for name, fn in inspect.getmembers(type(self.db), inspect.isfunction):
+            if name.startswith('_') or name in EXCLUDED_METHODS:
+                continue
+            bound = getattr(self.db, name)
+            wrapper = self._wrap_generator(name, bound) if inspect.isgeneratorfunction(fn) else self._wrap(name, bound)
+            # instance attribute shadows the class method
+            setattr(self.db, name, wrapper)
+            self._wrapped.append(name)
+
+        event.listen(self.db.engine, 'before_cursor_execute', self._before_execute)
+        event.listen(self.db.engine, 'after_cursor_execute', self._after_execute)
+        return self
+
+    def uninstall(self) -> None:
+        for name in self._wrapped:
+            delattr(self.db, name)
+        self._wrapped = []
+        if event.contains(self.db.engine, 'before_cursor_execute', self._before_execute):
+            event.remove(self.db.engine, 'before_cursor_execute', self._before_execute)
+            event.remove(self.db.engine, 'after_cursor_execute', self._after_execute)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats = {}
+
+    # ========================
+    # METHOD WRAPPERS
+    # ========================
+    def _stack(self) -> List[_Call]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _wrap(self, name: str, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            call = _Call(name)
+            stack = self._stack()
+            stack.append(call)
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = method(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                call.elapsed_s = time.perf_counter() - start
+                stack.pop()
+                self._record(call, failed)
+        return wrapper
+
+    def _wrap_generator(self, name: str, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            call = _Call(name)
+            stack = self._stack()
+            failed = True
+            generator = method(*args, **kwargs)
+            try:
+                while True:
+                    # only time spent inside the generator counts, not the consumer's loop body
+                    stack.append(call)
+                    start = time.perf_counter()
+                    try:
+                        item = next(generator)
+                    except StopIteration:
+                        break
+                    finally:
+                        call.elapsed_s += time.perf_counter() - start
+                        stack.pop()
+                    yield item
+                failed = False
+            except GeneratorExit:
+                # the consumer stopped early (break / close()), not an error
+                failed = False
+                raise
+            finally:
+                generator.close()
+                self._record(call, failed)
+        return wrapper
+
+    def _record(self, call: _Call, failed: bool) -> None:
+        with self._lock:
+            stats = self._stats.get(call.name)
+            if stats is None:
+                stats = self._stats[call.name] = MethodStats()
+            stats.calls += 1
+            stats.errors += failed
+            stats.total_s += call.elapsed_s
+            stats.max_s = max(stats.max_s, call.elapsed_s)
+            stats.statements += call.statements
+            stats.rows += call.rows
+            stats.slow_queries += call.slow_queries
+
+    # ========================
+    # ENGINE EVENTS
+    # ========================
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # kept on the execution context, so a statement that fails leaves nothing behind
+        context._instrumentation_start = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - context._instrumentation_start) * 1000
+        stack = self._stack()
+        slow = self.slow_query_ms is not None and elapsed_ms >= self.slow_query_ms
+        rows = max(cursor.rowcount, 0)
+
+        for call in stack:
+            call.statements += 1
+            call.rows += rows
+            call.slow_queries += slow
+
+        if slow:
+            method = stack[-1].name if stack else '-'
+            logger.warning("slow query (%.1f ms) in %s: %s", elapsed_ms, method, ' '.join(statement.split())[:500])
+
+    # ========================
+    # EXPORT
+    # ========================
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """{method: {calls, errors, total_ms, avg_ms, max_ms, statements, statements_per_call, rows, slow_queries}}"""
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in sorted(self._stats.items())}
+
+    def to_prometheus(self, prefix: str = 'librarymgtsys_db') -> str:
+        """
+        Prometheus text exposition format: one counter family per figure,
+        labelled by method, plus the connection pool gauges.
+        """
+        with self._lock:
+            stats = sorted(self._stats.items())
+            families = [
+                ('method_calls_total', 'counter', 'Calls per DatabaseManager method',
+                 [(name, s.calls) for name, s in stats]),
+                ('method_errors_total', 'counter', 'Calls that raised',
+                 [(name, s.errors) for name, s in stats]),
+                ('method_duration_seconds_total', 'counter', 'Wall time spent in the method',
+                 [(name, round(s.total_s, 6)) for name, s in stats]),
+                ('method_duration_seconds_max', 'gauge', 'Slowest single call',
+                 [(name, round(s.max_s, 6)) for name, s in stats]),
+                ('method_statements_total', 'counter', 'SQL statements executed',
+                 [(name, s.statements) for name, s in stats]),
+                ('method_rows_total', 'counter', 'Rows returned or affected (driver rowcount)',
+                 [(name, s.rows) for name, s in stats]),
+                ('method_slow_queries_total', 'counter', 'Statements over the slow query threshold',
+                 [(name, s.slow_queries) for name, s in stats]),
+            ]
+
+        lines = []
+        for metric, kind, help_text, samples in families:
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} {kind}")
+            for method, value in samples:
+                lines.append(f'{prefix}_{metric}{{method="{method}"}} {value}')
+
+        for key, value in self.db.pool_status().items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f"# TYPE {prefix}_pool_{key} gauge")
+                lines.append(f"{prefix}_pool_{key} {value}")
+
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,108 @@
+"""
+Background maintenance jobs, for cron or any scheduler.
+
+Every job is chunked and idempotent: running it twice, or from two machines at once,
+does no double work, so a short interval is safe.
+
+Usage (from the LibraryMgtSys folder):
+    python jobs.py due-reminders                      # run once
+    python jobs.py due-reminders --every 300          # run every 5 minutes until stopped
+    python jobs.py due-reminders --chunk-size 5000 --due-soon-days 3
+    python jobs.py expire-holds --every 600
+    python jobs.py archive-loans --archive-after-days 90
+    python jobs.py memberships --warn-days 14
+    python jobs.py cooccurrence --top-k 50
+    python jobs.py reconcile-stats --every 86400
+    python jobs.py circulation-report --since 2024-05-01 --until 2024-06-01 --output may.parquet
+"""
+import argparse
+import time
+from datetime import datetime, date
+
+from database_manager import DatabaseManager
+
+
+def due_reminders(db: DatabaseManager, args) -> dict:
+    """Due-soon and overdue notifications (DatabaseManager.send_due_reminders)."""
+    return db.send_due_reminders(due_soon_days=args.due_soon_days, chunk_size=args.chunk_size)
+
+
+def expire_holds(db: DatabaseManager, args) -> dict:
+    """Roll expired holds to the next waiter (DatabaseManager.expire_holds)."""
+    return {'expired': db.expire_holds(chunk_size=args.chunk_size)}
+
+
+def archive_loans(db: DatabaseManager, args) -> dict:
+    """Move old returned loans to the archive table (DatabaseManager.archive_returned_loans)."""
+    return {'archived': db.archive_returned_loans(older_than_days=args.archive_after_days, chunk_size=args.chunk_size)}
+
+
+def memberships(db: DatabaseManager, args) -> dict:
+    """Expire lapsed premium memberships and warn the ones about to lapse."""
+    return {
+        'expired': db.expire_memberships(),
+        'warned': db.send_expiry_warnings(days_ahead=args.warn_days)
+    }
+
+
+def cooccurrence(db: DatabaseManager, args) -> dict:
+    """Rebuild the "also borrowed" index (DatabaseManager.rebuild_cooccurrence)."""
+    return db.rebuild_cooccurrence(top_k=args.top_k, chunk_size=args.chunk_size)
+
+
+def reconcile_stats(db: DatabaseManager, args) -> dict:
+    """Recount the catalog_stats counters and fix drift (DatabaseManager.reconcile_stats)."""
+    return {'corrected': db.reconcile_stats()}
+
+
+def circulation_report(db: DatabaseManager, args) -> dict:
+    """Export loans borrowed in [--since, --until) to --output (DatabaseManager.export_circulation)."""
+    since = datetime.combine(args.since, datetime.min.time()) if args.since else None
+    until = datetime.combine(args.until, datetime.min.time()) if args.until else None
+    return db.export_circulation(args.output, since, until, batch_size=args.chunk_size)
+
+
+# job name -> function(db, args) returning a dict of counts to print
+JOBS = {
+    'due-reminders': due_reminders,
+    'expire-holds': expire_holds,
+    'archive-loans': archive_loans,
+    'memberships': memberships,
+    'cooccurrence': cooccurrence,
+    'reconcile-stats': reconcile_stats,
+    'circulation-report': circulation_report,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Library Management System maintenance jobs")
+    parser.add_argument('job', choices=list(JOBS))
+    parser.add_argument('--every', type=float, help="repeat every N seconds instead of running once")
+    parser.add_argument('--chunk-size', type=int, default=1000, help="rows per transaction")
+    parser.add_argument('--due-soon-days', type=int, default=2, help="due-reminders: remind this many days ahead")
+    parser.add_argument('--archive-after-days', type=int, default=30,
+                        help="archive-loans: archive loans returned more than this many days ago")
+    parser.add_argument('--warn-days', type=int, default=7,
+                        help="memberships: warn this many days before a membership expires")
+    parser.add_argument('--top-k', type=int, default=50, help="cooccurrence: related items kept per item")
+    parser.add_argument('--output', default='circulation.csv',
+                        help="circulation-report: .csv or .parquet file to write")
+    parser.add_argument('--since', type=date.fromisoformat, help="circulation-report: first borrow date (YYYY-MM-DD)")
+    parser.add_argument('--until', type=date.fromisoformat, help="circulation-report: end date, exclusive")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    job = JOBS[args.job]
+
+    while True:
+        start = time.perf_counter()
+        result = job(db, args)
+        print(f"{datetime.now():%Y-%m-%d %H:%M:%S} {args.job}: {result} ({time.perf_counter() - start:.2f} s)")
+
+        if not args.every:
+            return
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ from abc import ABC, abstractclassmethod
 from typing import List, Dict, Optional
 from database_manager import DatabaseManager
 from models import LibraryItemModel, BookModel, DVDModel, MemberModel, MembershipModel
+from records import ItemRecord, BorrowOutcome, MemberProfile, CatalogStats
 from datetime import date, datetime
 
 # -------------------------------
@@ -29,10 +30,10 @@ class LibraryItem(ABC):
 
     @property
     def available_copies(self) -> int:
-        """Always get current available copies from database"""
+        """Current available copies (read-through cache, invalidated on borrow/return)"""
         if self.id is None:
             return 0
-        item = self.db.get_item_by_id(self.id)
+        item = self.db.get_item_snapshot(self.id)
         return item.available_copies if item else 0
 
     def __str__(self) -> str:
@@ -102,14 +103,15 @@ class Book(LibraryItem):
         return 'Book'
     
     def get_item_info(self) -> str:
-        item = self.db.get_item_by_id(self.id)
+        # one snapshot for both the counts and the availability
+        item = self.db.get_item_snapshot(self.id)
         return (f"Title: {self.title}\n"
                 f"Author: {self.author}\n"
                 f"ISBN: {self.isbn}\n"
                 f"Pages: {self.num_pages}\n"
                 f"Type: {self.get_item_type()}\n"
                 f"Available: {item.available_copies}/{item.total_copies}\n"
-                f"Can be borrowed: {self.is_available()}")
+                f"Can be borrowed: {item.is_available()}")
     
 
 # -------------------------------
@@ -135,14 +137,15 @@ class DVD(LibraryItem):
         return 'DVD'
     
     def get_item_info(self) -> str:
-        item = self.db.get_item_by_id(self.id)
+        # one snapshot for both the counts and the availability
+        item = self.db.get_item_snapshot(self.id)
         return (f"Title: {self.title}\n"
                 f"Director: {self.director}\n"
                 f"Duration: {self.duration_minutes} minutes\n"
                 f"Genre: {self.genre}\n"
                 f"Type: {self.get_item_type()}\n"
                 f"Available: {item.available_copies}/{item.total_copies}\n"
-                f"Can be borrowed: {self.is_available()}")
+                f"Can be borrowed: {item.is_available()}")
     
 # -------------------------------
 # Member Base Class (Observer)
@@ -175,17 +178,14 @@ class Member(ABC):
 
     def get_borrowed_count(self) -> int:
         """Get count of currently borrowed items of this member from database"""
-        borrowed_items = self.db.get_member_borrowed_items(self.member_id)
-        return len(borrowed_items)
+        return self.db.count_active_borrows(self.member_id)
 
     def can_borrow(self) -> bool:
         """
         Check if member can borrow more items.
-        Checks both borrow limit and membership expiry.
+        Checks both borrow limit and membership expiry (one query).
         """
-        if self.db.check_membership_expiry(self.member_id):
-            return False
-        return self.get_borrowed_count() < self.get_max_borrow_limit()
+        return self.db.can_borrow(self.member_id)
     
     def borrow_item(self, item_id: int) -> bool:
         """
@@ -223,11 +223,17 @@ class Member(ABC):
         notifications = self.db.get_member_notifications(self.member_id, unread_only=False)
         return [nf.message for nf in notifications]
     
+    def get_profile(self) -> Optional[MemberProfile]:
+        """Membership, active loans, waiting list and unread count in one call (two queries)"""
+        return self.db.get_member_profile(self.member_id)
+
+    def get_unread_count(self) -> int:
+        """Number of unread notifications (cached)"""
+        return self.db.get_unread_count(self.member_id)
+
     def clear_notifications(self) -> None:
-        """Mark all notifications as read"""
-        notifications = self.db.get_member_notifications(self.member_id, unread_only=True)
-        for nf in notifications:
-            self.db.mark_notification_read(nf.id)
+        """Mark all notifications as read (one UPDATE)"""
+        self.db.mark_all_read(self.member_id)
 
     
 # -------------------------------
@@ -311,10 +317,28 @@ class Library:
         self.db = DatabaseManager()
         self._initialized = True
 
+    def batch(self):
+        """
+        Unit of work for a sequence of library operations.
+        All database calls inside the block share one session and commit once.
+
+        Usage:
+            with library.batch():
+                library.borrow_item(member_id, item_id)
+                library.leave_waiting_list(member_id, item_id)
+        """
+        return self.db.batch()
+
     def __len__(self) -> int:
-        """Get total number of items in library"""
-        items = self.db.get_all_items()
-        return len(items)
+        """Get total number of items in library (from the catalog counters, no table scan)"""
+        return self.stats().items
+
+    def stats(self) -> CatalogStats:
+        """
+        Dashboard numbers: items by type, total/available copies, active loans, waiting list entries.
+        Read from counters kept up to date by every write, so the cost doesn't grow with the catalog.
+        """
+        return self.db.stats()
 
     # item management
     def add_item(self, item: LibraryItem) -> bool:
@@ -350,19 +374,36 @@ class Library:
         """
         return self.db.borrow_item(member_id, item_id)
     
+    def borrow_items(self, member_id: int, item_ids: List[int]) -> List[BorrowOutcome]:
+        """
+        Borrow several items at once (one transaction, limit checked once).
+        Returns one BorrowOutcome (item_id, status) per item, in the given order.
+        """
+        return self.db.borrow_items(member_id, item_ids)
+
     def return_item(self, member_id: int, item_id: int) -> bool:
         """
         Return an item to the library.
-        Triggers notifications for waiting members.
+        If members are waiting, the copy is put on hold for the first of them,
+        who alone is notified; otherwise it goes back on the shelf.
         """
-        success = self.db.return_item(member_id, item_id)
+        return self.db.return_item(member_id, item_id)
 
-        if success:
-            # Notify waiting members
-            self.db.notify_waiting_members(item_id)
-        
-        return success
+    def expire_holds(self) -> int:
+        """Pass on copies whose hold ran out (normally run by jobs.py expire-holds)."""
+        return self.db.expire_holds()
     
+    def get_member_profile(self, member_id: int) -> Optional[MemberProfile]:
+        """
+        Everything about one member for a profile page:
+        membership, active loans, waiting list / holds and unread count.
+        """
+        return self.db.get_member_profile(member_id)
+
+    def get_related_items(self, item_id: int, k: int = 5) -> List[ItemRecord]:
+        """Members who borrowed this also borrowed: top k items (precomputed)."""
+        return self.db.get_related_items(item_id, k)
+
     # search
     def search_items(self, query: str) -> List[LibraryItemModel]:
         """
@@ -371,11 +412,17 @@ class Library:
         """
         return self.db.search_items(query)
     
+    def search_catalog(self, query: str, limit: int = 20, offset: int = 0) -> List[LibraryItemModel]:
+        """
+        Relevance-ranked, typo-tolerant search, one page at a time.
+        """
+        return self.db.search_catalog(query, limit, offset)
+
     # display
     def display_all_items(self) -> None:
-        items = self.db.get_all_items()
         print('All Items in the Library:')
-        for item in items:
+        # stream instead of loading every item first
+        for item in self.db.iter_items():
             print(f'{repr(item)} | Available: {item.available_copies}/{item.total_copies}\n')
 
     def display_all_members(self) -> None:
@@ -394,29 +441,30 @@ class Library:
         Add member to waiting list for an item.
         Only works if item is currently unavailable.
         """
-        # Check if item is currently available
-        item = self.db.get_item_by_id(item_id)
-        if item and item.is_available():
-            return False 
+        with self.batch():
+            # Check if item is currently available
+            item = self.db.get_item_by_id(item_id)
+            if item and item.is_available():
+                return False 
 
-        return self.db.join_waiting_list(member_id, item_id)
+            return self.db.join_waiting_list(member_id, item_id)
     
     def leave_waiting_list(self, member_id: int, item_id: int) -> bool:
         return self.db.leave_waiting_list(member_id, item_id)
     
-    def notify_waiting_members(self, item_id: int) -> None:
-        # Check if item is available
-        item = self.db.get_item_by_id(item_id)
-        if not item or not item.is_available():
-            return
-
-        # Get waiting members from database
-        waiting_members = self.db.get_waiting_list(item_id)
-
-        # Notify 
-        message = f"'{item.title}' is now available"
-        for member in waiting_members:
-            self.db.create_notification(member.id, message)
+    def notify_waiting_members(self, item_id: int) -> int:
+        """
+        Notify everyone waiting for an item, if it is available.
+        Returns the number of members notified.
+        """
+        with self.batch():
+            # Check if item is available
+            item = self.db.get_item_by_id(item_id)
+            if not item or not item.is_available():
+                return 0
+
+            # Notify with one INSERT ... SELECT over the waiting list
+            return self.db.notify_waiting_members(item_id)
 
 def main():
     print("=" * 70)
@@ -1,10 +1,10 @@
 from sqlalchemy import (
-    Column, Integer, String, DateTime, Date, Boolean, Text,
-    ForeignKey, CheckConstraint, UniqueConstraint
+    Column, Integer, SmallInteger, BigInteger, String, DateTime, Date, Boolean, Text,
+    ForeignKey, CheckConstraint, UniqueConstraint, Index, select, text, literal, event, DDL
 )
-from sqlalchemy.orm import relationship, DeclarativeBase # declarative_base # this is old version
+from sqlalchemy.orm import relationship, DeclarativeBase, object_session # declarative_base # this is old version
 from sqlalchemy.sql import func
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from typing import List, Optional
 
 # Base = declarative_base()
@@ -12,6 +12,36 @@ class Base(DeclarativeBase):
     pass
 
 
+# loan period per membership type: due_date = borrow time + this many days
+LOAN_PERIOD_DAYS = {'regular': 14, 'premium': 28}
+
+
+def loan_due_date(membership_type: str, borrowed_at: datetime) -> datetime:
+    return borrowed_at + timedelta(days=LOAN_PERIOD_DAYS.get(membership_type, LOAN_PERIOD_DAYS['regular']))
+
+
+# how long a returned copy stays reserved for the head of its waiting list
+HOLD_PERIOD_DAYS = 3
+
+
+# BorrowedItemModel.reminder_level: the latest reminder sent for a loan
+REMINDER_NONE = 0
+REMINDER_DUE_SOON = 1
+REMINDER_OVERDUE = 2
+
+
+# a borrow adds "also borrowed" scores for pairs with at most this many of the member's
+# most recently borrowed other items; the nightly rebuild counts the whole history
+COOCCURRENCE_RECENT_ITEMS = 50
+
+
+# catalog_stats counters (see CatalogStatModel)
+CATALOG_STATS = ('books', 'dvds', 'total_copies', 'available_copies', 'active_loans', 'waiting')
+# rows per counter: each transaction adds to one random shard, so concurrent
+# borrows/returns rarely wait on the same counter row
+STAT_SHARDS = 16
+
+
 class LibraryItemModel(Base):
     __tablename__ = 'library_items'
     __table_args__ = {'schema': 'librarymgtsys'}
@@ -42,12 +72,44 @@ class LibraryItemModel(Base):
     
     def get_active_borrows(self) -> List['BorrowedItemModel']:
         """get all active, not returned, borrows for this item"""
-        return [borrow for borrow in self.borrowed_items if borrow.status == 'borrowed']
+        session = object_session(self)
+        if session is None:
+            # detached: can only look at whatever history is already loaded
+            return [borrow for borrow in self.borrowed_items if borrow.status == 'borrowed']
+        # query only the active rows instead of lazy-loading the full history
+        return session.scalars(
+            select(BorrowedItemModel).where(
+                BorrowedItemModel.item_id == self.id,
+                BorrowedItemModel.status == 'borrowed'
+            )
+        ).all()
     
     def __repr__(self):
         return f"<LibraryItem(id={self.id}, title='{self.title}', type='{self.item_type}', available={self.available_copies}/{self.total_copies})>"
 
 
+# Full-text search document for an item: to_tsvector('simple', title || ' ' || creator)
+# The same expression is used by the GIN index below and by DatabaseManager.search_catalog,
+# so the planner can match the query to the index.
+# (literal_execute renders the constants inline, which index matching needs)
+SEARCH_DOCUMENT = func.to_tsvector(
+    literal('simple', literal_execute=True),
+    LibraryItemModel.title + literal(' ', literal_execute=True) + LibraryItemModel.creator
+)
+
+# Search indexes are PostgreSQL-only (ddl_if), other databases just skip them
+Index('ix_library_items_search_tsv', SEARCH_DOCUMENT, postgresql_using='gin').ddl_if(dialect='postgresql')
+# trigram indexes: typo-tolerant similarity and fast ILIKE '%q%'
+Index(
+    'ix_library_items_title_trgm', LibraryItemModel.title,
+    postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}
+).ddl_if(dialect='postgresql')
+Index(
+    'ix_library_items_creator_trgm', LibraryItemModel.creator,
+    postgresql_using='gin', postgresql_ops={'creator': 'gin_trgm_ops'}
+).ddl_if(dialect='postgresql')
+
+
 class BookModel(Base):
     __tablename__ = 'books'
     __table_args__ = {'schema': 'librarymgtsys'}
@@ -87,6 +149,11 @@ class MembershipModel(Base):
     membership_type = Column(String(20), nullable=False)
     borrow_limit = Column(Integer, nullable=False)
     expiry_date = Column(Date, nullable=True)
+    # precomputed by the expiry sweep (DatabaseManager.expire_memberships), read by the borrow path;
+    # set back to True on renewal
+    is_active = Column(Boolean, nullable=False, default=True)
+    # expiry_date the last expiry warning was about; a renewal moves expiry_date, re-arming the warning
+    expiry_warning_sent_for = Column(Date, nullable=True)
     created_at = Column(DateTime, default=func.current_timestamp())
     updated_at = Column(DateTime, default=func.current_timestamp(), onupdate=func.current_timestamp())
     
@@ -101,6 +168,8 @@ class MembershipModel(Base):
             "(membership_type = 'regular' AND expiry_date IS NULL) OR (membership_type = 'premium' AND expiry_date IS NOT NULL)",
             name='check_expiry_date'
         ),
+        # expiry sweep / warnings: premium memberships by expiry date
+        Index('ix_memberships_type_expiry', 'membership_type', 'expiry_date'),
         {'schema': 'librarymgtsys'}
     )
     
@@ -128,6 +197,7 @@ class MembershipModel(Base):
                 self.expiry_date = date.today() + timedelta(days=days)
             else:
                 self.expiry_date = self.expiry_date + timedelta(days=days)
+            self.is_active = True
             self.updated_at = datetime.now()
     
     def __repr__(self):
@@ -158,7 +228,18 @@ class MemberModel(Base):
     
     def get_borrowed_count(self) -> int:
         """get count of currently borrowed (not returned) items"""
-        return len([borrow for borrow in self.borrowed_items if borrow.status == 'borrowed'])
+        session = object_session(self)
+        if session is None:
+            # detached: can only look at whatever history is already loaded
+            return len([borrow for borrow in self.borrowed_items if borrow.status == 'borrowed'])
+        # COUNT served by the partial index on borrowed_items(member_id) WHERE status = 'borrowed',
+        # so the cost doesn't grow with the member's returned history
+        return session.scalar(
+            select(func.count(BorrowedItemModel.id)).where(
+                BorrowedItemModel.member_id == self.id,
+                BorrowedItemModel.status == 'borrowed'
+            )
+        )
     
     def can_borrow(self) -> bool:
         """check if member can borrow more items"""
@@ -184,8 +265,11 @@ class BorrowedItemModel(Base):
     member_id = Column(Integer, ForeignKey('librarymgtsys.members.id', onupdate='CASCADE', ondelete='CASCADE'), nullable=False)
     item_id = Column(Integer, ForeignKey('librarymgtsys.library_items.id', onupdate='CASCADE', ondelete='CASCADE'), nullable=False)
     borrow_date = Column(DateTime, default=func.current_timestamp())
+    due_date = Column(DateTime, nullable=True)
     return_date = Column(DateTime, nullable=True)
     status = Column(String(20), nullable=False, default='borrowed')
+    # REMINDER_* sent so far; the reminder job only moves it up, so reruns send nothing twice
+    reminder_level = Column(SmallInteger, nullable=False, default=REMINDER_NONE)
     
     # Relationships
     member = relationship("MemberModel", back_populates="borrowed_items")
@@ -193,13 +277,90 @@ class BorrowedItemModel(Base):
     
     __table_args__ = (
         CheckConstraint("status IN ('borrowed', 'returned')", name='check_status'),
-        {'schema': 'librarymgtsys'}
+        # partial index: only active loans, used by borrow-limit checks
+        Index(
+            'ix_borrowed_items_member_active', 'member_id',
+            postgresql_where=text("status = 'borrowed'"),
+            sqlite_where=text("status = 'borrowed'")
+        ),
+        # an item's / a member's borrow history, newest first
+        Index('ix_borrowed_items_item_borrow_date', 'item_id', 'borrow_date'),
+        Index('ix_borrowed_items_member_borrow_date', 'member_id', 'borrow_date'),
+        # reminder job: active loans due before a cutoff
+        Index('ix_borrowed_items_status_due', 'status', 'due_date'),
+        # ids are kept when loans move to borrowed_items_archive, so they must never be reused;
+        # SQLite reuses the highest rowid once its row is deleted, unless AUTOINCREMENT is on
+        # (PostgreSQL sequences never go back)
+        {'schema': 'librarymgtsys', 'sqlite_autoincrement': True}
     )
     
+    def is_overdue(self) -> bool:
+        return self.status == 'borrowed' and self.due_date is not None and self.due_date < datetime.now()
+
     def __repr__(self):
         return f"<BorrowedItem(id={self.id}, member_id={self.member_id}, item_id={self.item_id}, status='{self.status}')>"
 
 
+class BorrowedItemArchiveModel(Base):
+    """
+    Returned loans moved out of borrowed_items by DatabaseManager.archive_returned_loans,
+    so the hot table only holds active and recently returned loans.
+    Rows keep their borrowed_items id; history queries read both tables (queries.borrow_history).
+    """
+    __tablename__ = 'borrowed_items_archive'
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    member_id = Column(Integer, ForeignKey('librarymgtsys.members.id', onupdate='CASCADE', ondelete='CASCADE'), nullable=False)
+    item_id = Column(Integer, ForeignKey('librarymgtsys.library_items.id', onupdate='CASCADE', ondelete='CASCADE'), nullable=False)
+    borrow_date = Column(DateTime)
+    due_date = Column(DateTime, nullable=True)
+    return_date = Column(DateTime, nullable=True)
+    status = Column(String(20), nullable=False, default='returned')
+
+    __table_args__ = (
+        # an item's / a member's history, newest first
+        Index('ix_borrowed_items_archive_item_borrow_date', 'item_id', 'borrow_date'),
+        Index('ix_borrowed_items_archive_member_borrow_date', 'member_id', 'borrow_date'),
+        {'schema': 'librarymgtsys'}
+    )
+
+    def __repr__(self):
+        return f"<BorrowedItemArchive(id={self.id}, member_id={self.member_id}, item_id={self.item_id})>"
+
+
+class ItemCooccurrenceModel(Base):
+    """
+    "Members who borrowed this also borrowed": score = number of members who borrowed
+    both item_id and related_item_id. Stored in both directions.
+    Kept current by borrow_item / borrow_items (DatabaseManager) and rebuilt nightly
+    from the full history, keeping the top K related items per item.
+    """
+    __tablename__ = 'item_cooccurrence'
+
+    item_id = Column(Integer, ForeignKey('librarymgtsys.library_items.id', onupdate='CASCADE', ondelete='CASCADE'), primary_key=True)
+    related_item_id = Column(Integer, ForeignKey('librarymgtsys.library_items.id', onupdate='CASCADE', ondelete='CASCADE'), primary_key=True)
+    score = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # an item's related items, best first
+        Index('ix_item_cooccurrence_item_score', item_id, score.desc()),
+        {'schema': 'librarymgtsys'}
+    )
+
+    def __repr__(self):
+        return f"<ItemCooccurrence(item_id={self.item_id}, related_item_id={self.related_item_id}, score={self.score})>"
+
+
+class ItemCooccurrenceRebuildModel(Base):
+    """Scratch table the nightly rebuild accumulates scores in before swapping them into item_cooccurrence."""
+    __tablename__ = 'item_cooccurrence_rebuild'
+    __table_args__ = {'schema': 'librarymgtsys'}
+
+    item_id = Column(Integer, primary_key=True)
+    related_item_id = Column(Integer, primary_key=True)
+    score = Column(Integer, nullable=False, default=0)
+
+
 class WaitingListModel(Base):
     __tablename__ = 'waiting_list'
     __table_args__ = {'schema': 'librarymgtsys'}
@@ -208,6 +369,9 @@ class WaitingListModel(Base):
     member_id = Column(Integer, ForeignKey('librarymgtsys.members.id', onupdate='CASCADE', ondelete='CASCADE'), nullable=False)
     item_id = Column(Integer, ForeignKey('librarymgtsys.library_items.id', onupdate='CASCADE', ondelete='CASCADE'), nullable=False)
     joined_at = Column(DateTime, default=func.current_timestamp())
+    # NULL while waiting; set when a returned copy is reserved for this member,
+    # who can borrow it until then (the copy is not in available_copies meanwhile)
+    hold_expires_at = Column(DateTime, nullable=True)
     
     # Relationships
     member = relationship("MemberModel", back_populates="waiting_list_entries")
@@ -215,9 +379,20 @@ class WaitingListModel(Base):
     
     __table_args__ = (
         UniqueConstraint('member_id', 'item_id', name='unique_member_item'),
+        # an item's waiting list in join order
+        Index('ix_waiting_list_item_joined', 'item_id', 'joined_at'),
+        # partial index: only current holds, for the expiry sweep
+        Index(
+            'ix_waiting_list_hold_expires', 'hold_expires_at',
+            postgresql_where=text("hold_expires_at IS NOT NULL"),
+            sqlite_where=text("hold_expires_at IS NOT NULL")
+        ),
         {'schema': 'librarymgtsys'}
     )
     
+    def is_holding(self) -> bool:
+        return self.hold_expires_at is not None and self.hold_expires_at >= datetime.now()
+
     def __repr__(self):
         return f"<WaitingList(id={self.id}, member_id={self.member_id}, item_id={self.item_id})>"
 
@@ -234,6 +409,36 @@ class NotificationModel(Base):
     
     # Relationships
     member = relationship("MemberModel", back_populates="notifications")
+
+    __table_args__ = (
+        # inbox queries: a member's (unread) notifications, newest first
+        Index('ix_notifications_member_inbox', member_id, is_read, created_at.desc()),
+        {'schema': 'librarymgtsys'}
+    )
     
     def __repr__(self):
-        return f"<Notification(id={self.id}, member_id={self.member_id}, read={self.is_read})>"
\ No newline at end of file
+        return f"<Notification(id={self.id}, member_id={self.member_id}, read={self.is_read})>"
+
+
+class CatalogStatModel(Base):
+    """
+    Catalog-wide counters, kept up to date by the writes that change them (in the same transaction).
+    A counter's value is the sum over its STAT_SHARDS rows.
+    """
+    __tablename__ = 'catalog_stats'
+    __table_args__ = {'schema': 'librarymgtsys'}
+
+    name = Column(String(32), primary_key=True)
+    shard = Column(SmallInteger, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CatalogStat(name={self.name}, shard={self.shard}, value={self.value})>"
+
+
+# pg_trgm provides the gin_trgm_ops operator class used by the trigram indexes
+event.listen(
+    Base.metadata,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
@@ -0,0 +1,65 @@
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from typing import Dict, Any
+import threading
+import time
+
+
+class PoolMetrics:
+    """
+    Counters for connection checkouts: how many, how long callers waited, how many timed out.
+    Thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_s = 0.0
+        self.max_wait_s = 0.0
+
+    def record_checkout(self, wait_s: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_s += wait_s
+            self.max_wait_s = max(self.max_wait_s, wait_s)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'checkout_timeouts': self.timeouts,
+                'checkout_wait_avg_ms': round(self.total_wait_s / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'checkout_wait_max_ms': round(self.max_wait_s * 1000, 3)
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that times every checkout (waiting for a free slot + opening a new connection).
+    Use with create_engine(url, poolclass=InstrumentedQueuePool).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            conn = super().connect()
+        except PoolTimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_checkout(time.perf_counter() - start)
+        return conn
+
+    def recreate(self):
+        # engine.dispose() / invalidation builds a new pool; keep counting into the same metrics
+        new_pool = super().recreate()
+        new_pool.metrics = self.metrics
+        return new_pool
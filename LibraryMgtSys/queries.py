@@ -0,0 +1,1008 @@
+"""
+SQL statement builders shared by DatabaseManager and AsyncDatabaseManager.
+
+Each function only *builds* a statement; the caller executes it with a sync
+or async session. Keeping the SQL here means both managers always send
+exactly the same queries (and hit the same indexes).
+"""
+from datetime import date, datetime
+from typing import List, Optional
+
+from sqlalchemy import select, insert, update, delete, func, or_, and_, case, literal, union, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import joinedload
+
+from models import (
+    LibraryItemModel, MemberModel, MembershipModel, BorrowedItemModel, BorrowedItemArchiveModel,
+    ItemCooccurrenceModel, ItemCooccurrenceRebuildModel, WaitingListModel, NotificationModel, CatalogStatModel,
+    SEARCH_DOCUMENT, CATALOG_STATS, STAT_SHARDS
+)
+from records import ItemRecord, MemberRecord, NotificationRecord, LoanRecord
+
+
+# ========================
+# RECORDS
+# ========================
+# columns of each record type, in field order
+RECORD_COLUMNS = {
+    ItemRecord: (
+        LibraryItemModel.id, LibraryItemModel.title, LibraryItemModel.creator, LibraryItemModel.item_type,
+        LibraryItemModel.total_copies, LibraryItemModel.available_copies
+    ),
+    MemberRecord: (
+        MemberModel.id, MemberModel.name, MemberModel.email, MemberModel.membership_id, MemberModel.created_at
+    ),
+    NotificationRecord: (
+        NotificationModel.id, NotificationModel.member_id, NotificationModel.message,
+        NotificationModel.is_read, NotificationModel.created_at
+    ),
+    LoanRecord: (
+        BorrowedItemModel.id, BorrowedItemModel.member_id, BorrowedItemModel.item_id, BorrowedItemModel.borrow_date,
+        BorrowedItemModel.due_date, BorrowedItemModel.return_date, BorrowedItemModel.status
+    ),
+}
+
+
+def as_records(stmt, record_type):
+    """
+    Turn select(Model)... into the same query over just the record's columns
+    (joins, WHERE and ORDER BY are kept). Rows map 1:1 onto record_type._make(row).
+    """
+    return stmt.with_only_columns(*RECORD_COLUMNS[record_type])
+
+
+# ========================
+# ITEMS / SEARCH
+# ========================
+def all_items():
+    return select(LibraryItemModel)
+
+
+def item_snapshot(item_id: int):
+    return as_records(select(LibraryItemModel).where(LibraryItemModel.id == item_id), ItemRecord)
+
+
+def search_items(query: str):
+    """title or creator ILIKE '%query%'"""
+    query_lower = query.lower()
+    return select(LibraryItemModel).where(
+        (LibraryItemModel.title.ilike(f'%{query_lower}%')) |
+        (LibraryItemModel.creator.ilike(f'%{query_lower}%'))
+    )
+
+
+def search_catalog(query: str, dialect_name: str, limit: int, offset: int):
+    """
+    Relevance-ranked catalog search (see DatabaseManager.search_catalog).
+    query must already be stripped and non-empty.
+    """
+    # escape LIKE wildcards typed by the user
+    pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    substring_match = or_(
+        LibraryItemModel.title.ilike(pattern, escape='\\'),
+        LibraryItemModel.creator.ilike(pattern, escape='\\')
+    )
+
+    if dialect_name == 'postgresql':
+        ts_query = func.plainto_tsquery(literal('simple', literal_execute=True), query)
+        similarity = func.greatest(
+            func.word_similarity(query, LibraryItemModel.title),
+            func.word_similarity(query, LibraryItemModel.creator)
+        )
+        stmt = select(LibraryItemModel).where(
+            or_(
+                SEARCH_DOCUMENT.op('@@')(ts_query),
+                literal(query).op('<%')(LibraryItemModel.title),
+                literal(query).op('<%')(LibraryItemModel.creator),
+                substring_match
+            )
+        ).order_by(
+            (func.ts_rank(SEARCH_DOCUMENT, ts_query) + similarity).desc(),
+            LibraryItemModel.id
+        )
+    else:
+        stmt = select(LibraryItemModel).where(substring_match).order_by(
+            LibraryItemModel.title, LibraryItemModel.id
+        )
+
+    return stmt.limit(limit).offset(offset)
+
+
+# ========================
+# BORROWING
+# ========================
+def active_loans_count(member_id: int):
+    """
+    SELECT COUNT(*) of a member's active loans.
+    Served by the partial index ix_borrowed_items_member_active,
+    so it stays cheap no matter how much returned history the member has.
+    """
+    return select(func.count(BorrowedItemModel.id)).where(
+        BorrowedItemModel.member_id == member_id,
+        BorrowedItemModel.status == 'borrowed'
+    )
+
+
+def lock_member_for_borrow(member_id: int, item_id: Optional[int] = None):
+    """
+    SELECT ... FOR UPDATE on the member row, returning (borrow_limit, membership_type),
+    plus a third column 'held' if item_id is given: whether a copy of it is on hold for the member.
+    No row if the member doesn't exist or the membership is inactive
+    (is_active, kept up to date by the expiry sweep, so no date arithmetic per borrow).
+    The lock serializes concurrent borrows by the same member.
+    """
+    columns = [MembershipModel.borrow_limit, MembershipModel.membership_type]
+    if item_id is not None:
+        columns.append(active_holds(member_id, [item_id]).exists().label('held'))
+
+    return select(*columns).join(
+        MemberModel, MemberModel.membership_id == MembershipModel.id
+    ).where(
+        MemberModel.id == member_id,
+        MembershipModel.is_active == True
+    ).with_for_update(of=MemberModel)
+
+
+def can_borrow(member_id: int):
+    """
+    SELECT is_active AND <active loans> < borrow_limit FROM memberships WHERE member_id = :member_id
+    (no row if the member has no membership)
+    """
+    return select(
+        and_(
+            MembershipModel.is_active == True,
+            active_loans_count(member_id).scalar_subquery() < MembershipModel.borrow_limit
+        )
+    ).where(MembershipModel.member_id == member_id)
+
+
+def claim_copy(member_id: int, item_id: int, borrow_limit: int):
+    """
+    Take one copy only if one is left and the member is under the limit:
+        UPDATE library_items SET available_copies = available_copies - 1
+        WHERE id = :item_id AND available_copies > 0 AND <active loans> < :limit
+        RETURNING id
+    """
+    return update(LibraryItemModel).where(
+        LibraryItemModel.id == item_id,
+        LibraryItemModel.available_copies > 0,
+        active_loans_count(member_id).scalar_subquery() < borrow_limit
+    ).values(
+        available_copies=LibraryItemModel.available_copies - 1
+    ).returning(LibraryItemModel.id).execution_options(synchronize_session=False)
+
+
+def lock_items(item_ids: List[int]):
+    """
+    SELECT id, available_copies ... FOR UPDATE, in id order.
+    Every multi-item checkout takes its row locks in the same (ascending id) order,
+    so two checkouts sharing items wait for each other instead of deadlocking.
+    """
+    return select(LibraryItemModel.id, LibraryItemModel.available_copies).where(
+        LibraryItemModel.id.in_(item_ids)
+    ).order_by(LibraryItemModel.id).with_for_update()
+
+
+def active_holds(member_id: int, item_ids: List[int]):
+    """SELECT item_id of the member's unexpired holds on the given items"""
+    return select(WaitingListModel.item_id).where(
+        WaitingListModel.member_id == member_id,
+        WaitingListModel.item_id.in_(item_ids),
+        WaitingListModel.hold_expires_at >= datetime.now()
+    )
+
+
+def consume_hold(member_id: int, item_id: int, borrow_limit: int):
+    """
+    Turn the member's hold into a loan, if it hasn't expired and the member is under the limit:
+        DELETE FROM waiting_list
+        WHERE member_id = :member_id AND item_id = :item_id AND hold_expires_at >= now()
+          AND <active loans> < :limit
+        RETURNING id
+    The held copy is already out of available_copies, so nothing else changes on the item.
+    """
+    return delete(WaitingListModel).where(
+        WaitingListModel.member_id == member_id,
+        WaitingListModel.item_id == item_id,
+        WaitingListModel.hold_expires_at >= datetime.now(),
+        active_loans_count(member_id).scalar_subquery() < borrow_limit
+    ).returning(WaitingListModel.id).execution_options(synchronize_session=False)
+
+
+def remove_waiting_list_entries(member_id: int, item_ids: List[int]):
+    """
+    DELETE the member's waiting list entries for the given items
+    RETURNING item_id, hold_expires_at (not NULL: the entry held a copy)
+    """
+    return delete(WaitingListModel).where(
+        WaitingListModel.member_id == member_id,
+        WaitingListModel.item_id.in_(item_ids)
+    ).returning(
+        WaitingListModel.item_id, WaitingListModel.hold_expires_at
+    ).execution_options(synchronize_session=False)
+
+
+def take_copies(item_ids: List[int]):
+    """available_copies - 1 on every given item, in one UPDATE"""
+    return update(LibraryItemModel).where(
+        LibraryItemModel.id.in_(item_ids),
+        LibraryItemModel.available_copies > 0
+    ).values(
+        available_copies=LibraryItemModel.available_copies - 1
+    ).execution_options(synchronize_session=False)
+
+
+def insert_loan(member_id: int, item_id: int, due_date: datetime):
+    return insert(BorrowedItemModel).values(
+        member_id = member_id,
+        item_id = item_id,
+        due_date = due_date,
+        status = 'borrowed'
+    )
+
+
+def close_active_loan(member_id: int, item_id: int):
+    """
+    Mark one active loan returned; the row is picked FOR UPDATE SKIP LOCKED,
+    so concurrent returns never close the same loan twice.
+    """
+    active_loan = select(BorrowedItemModel.id).where(
+        BorrowedItemModel.member_id == member_id,
+        BorrowedItemModel.item_id == item_id,
+        BorrowedItemModel.status == 'borrowed'
+    ).order_by(BorrowedItemModel.borrow_date).limit(1).with_for_update(skip_locked=True).scalar_subquery()
+
+    return update(BorrowedItemModel).where(
+        BorrowedItemModel.id == active_loan,
+        BorrowedItemModel.status == 'borrowed'
+    ).values(
+        status='returned', return_date=datetime.now()
+    ).returning(BorrowedItemModel.id).execution_options(synchronize_session=False)
+
+
+def release_copy(item_id: int):
+    """available_copies + 1, never above total_copies"""
+    return update(LibraryItemModel).where(
+        LibraryItemModel.id == item_id,
+        LibraryItemModel.available_copies < LibraryItemModel.total_copies
+    ).values(
+        available_copies=LibraryItemModel.available_copies + 1
+    ).execution_options(synchronize_session=False)
+
+
+# ========================
+# MEMBER PROFILE
+# ========================
+def member_with_membership(member_id: int):
+    """
+    (MemberModel with membership eager-loaded, unread notification count) in one SELECT:
+        SELECT members.*, memberships.*, (SELECT COUNT(*) FROM notifications WHERE ... unread) AS unread_count
+        FROM members LEFT OUTER JOIN memberships ON ... WHERE members.id = :member_id
+    """
+    return select(
+        MemberModel, unread_count(member_id).scalar_subquery().label('unread_count')
+    ).options(
+        joinedload(MemberModel.membership)
+    ).where(MemberModel.id == member_id)
+
+
+def member_profile_entries(member_id: int):
+    """
+    A member's active loans and waiting list entries with their items, in one SELECT:
+        SELECT 'loan', b.id, b.item_id, i.title, i.item_type, b.borrow_date, b.due_date
+        FROM borrowed_items b JOIN library_items i ON ... WHERE b.member_id = :id AND b.status = 'borrowed'
+        UNION ALL
+        SELECT 'waiting', w.id, w.item_id, i.title, i.item_type, w.joined_at, w.hold_expires_at
+        FROM waiting_list w JOIN library_items i ON ... WHERE w.member_id = :id
+    Rows map onto records.ProfileEntry. Loans come from the active-loans partial index,
+    so returned history is never read.
+    """
+    loans = select(
+        literal('loan').label('kind'),
+        BorrowedItemModel.id.label('entry_id'),
+        BorrowedItemModel.item_id,
+        LibraryItemModel.title,
+        LibraryItemModel.item_type,
+        BorrowedItemModel.borrow_date.label('since'),
+        BorrowedItemModel.due_date.label('until')
+    ).join(
+        LibraryItemModel, LibraryItemModel.id == BorrowedItemModel.item_id
+    ).where(
+        BorrowedItemModel.member_id == member_id,
+        BorrowedItemModel.status == 'borrowed'
+    )
+
+    waiting = select(
+        literal('waiting'),
+        WaitingListModel.id,
+        WaitingListModel.item_id,
+        LibraryItemModel.title,
+        LibraryItemModel.item_type,
+        WaitingListModel.joined_at,
+        WaitingListModel.hold_expires_at
+    ).join(
+        LibraryItemModel, LibraryItemModel.id == WaitingListModel.item_id
+    ).where(
+        WaitingListModel.member_id == member_id
+    )
+
+    entries = union_all(loans, waiting).subquery()
+    return select(entries).order_by(entries.c.kind, entries.c.since, entries.c.entry_id)
+
+
+# ========================
+# MEMBERSHIP EXPIRY
+# ========================
+def expire_memberships(today: date):
+    """
+    Flag every premium membership that expired before today, in one statement:
+        UPDATE memberships SET is_active = false
+        WHERE membership_type = 'premium' AND expiry_date < :today AND is_active
+        RETURNING member_id, expiry_date
+    A range scan on the (membership_type, expiry_date) index; already flagged rows are skipped.
+    """
+    return update(MembershipModel).where(
+        MembershipModel.membership_type == 'premium',
+        MembershipModel.expiry_date < today,
+        MembershipModel.is_active == True
+    ).values(
+        is_active=False, updated_at=datetime.now()
+    ).returning(MembershipModel.member_id, MembershipModel.expiry_date).execution_options(synchronize_session=False)
+
+
+def claim_expiry_warnings(today: date, warn_until: date):
+    """
+    Mark active premium memberships expiring in [today, warn_until] as warned, returning them:
+        UPDATE memberships SET expiry_warning_sent_for = expiry_date
+        WHERE membership_type = 'premium' AND expiry_date BETWEEN :today AND :warn_until AND is_active
+          AND (expiry_warning_sent_for IS NULL OR expiry_warning_sent_for <> expiry_date)
+        RETURNING member_id, expiry_date
+    One warning per expiry date: a renewal moves expiry_date, so the next expiry is warned about again.
+    """
+    return update(MembershipModel).where(
+        MembershipModel.membership_type == 'premium',
+        MembershipModel.expiry_date >= today,
+        MembershipModel.expiry_date <= warn_until,
+        MembershipModel.is_active == True,
+        or_(
+            MembershipModel.expiry_warning_sent_for.is_(None),
+            MembershipModel.expiry_warning_sent_for != MembershipModel.expiry_date
+        )
+    ).values(
+        expiry_warning_sent_for=MembershipModel.expiry_date
+    ).returning(MembershipModel.member_id, MembershipModel.expiry_date).execution_options(synchronize_session=False)
+
+
+# ========================
+# BORROW HISTORY / ARCHIVE
+# ========================
+def _loan_columns(model):
+    """LoanRecord's columns on borrowed_items or borrowed_items_archive (same names)"""
+    return [getattr(model, name) for name in LoanRecord._fields]
+
+
+def borrow_history(item_id: Optional[int], member_id: Optional[int], limit: int, before_id: Optional[int]):
+    """
+    One page of loans from both the hot table and the archive, newest first,
+    keyset-paginated on (borrow_date, id):
+        SELECT * FROM (
+            (SELECT ... FROM borrowed_items WHERE <filter> AND <before cursor>
+             ORDER BY borrow_date DESC, id DESC LIMIT :limit)
+            UNION ALL
+            (SELECT ... FROM borrowed_items_archive WHERE <same> ORDER BY ... LIMIT :limit)
+        ) ORDER BY borrow_date DESC, id DESC LIMIT :limit
+    Each side reads at most one page off its (item_id | member_id, borrow_date) index,
+    so a page costs the same however many years of history there are.
+    """
+    cursor_borrow_date = None
+    if before_id is not None:
+        # the cursor loan may live in either table
+        cursor_borrow_date = func.coalesce(
+            select(BorrowedItemModel.borrow_date).where(BorrowedItemModel.id == before_id).scalar_subquery(),
+            select(BorrowedItemArchiveModel.borrow_date).where(BorrowedItemArchiveModel.id == before_id).scalar_subquery()
+        )
+
+    pages = []
+    for model in (BorrowedItemModel, BorrowedItemArchiveModel):
+        stmt = select(*_loan_columns(model))
+        if item_id is not None:
+            stmt = stmt.where(model.item_id == item_id)
+        if member_id is not None:
+            stmt = stmt.where(model.member_id == member_id)
+        if before_id is not None:
+            # rows strictly after the cursor in (borrow_date DESC, id DESC) order
+            stmt = stmt.where(or_(
+                model.borrow_date < cursor_borrow_date,
+                and_(model.borrow_date == cursor_borrow_date, model.id < before_id)
+            ))
+        page = stmt.order_by(model.borrow_date.desc(), model.id.desc()).limit(limit).subquery()
+        # wrapped, because SQLite doesn't allow ORDER BY / LIMIT inside a UNION member
+        pages.append(select(page))
+
+    history = union_all(*pages).subquery()
+    return select(history).order_by(history.c.borrow_date.desc(), history.c.id.desc()).limit(limit)
+
+
+def all_loans(item_id: Optional[int], after_id: Optional[int], limit: Optional[int]):
+    """
+    Loans from both tables in id (= borrow) order, optionally after a cursor id:
+    SELECT ... FROM borrowed_items UNION ALL SELECT ... FROM borrowed_items_archive ORDER BY id
+    """
+    parts = []
+    for model in (BorrowedItemModel, BorrowedItemArchiveModel):
+        stmt = select(*_loan_columns(model))
+        if item_id is not None:
+            stmt = stmt.where(model.item_id == item_id)
+        if after_id is not None:
+            stmt = stmt.where(model.id > after_id)
+        parts.append(stmt)
+
+    loans = union_all(*parts).subquery()
+    stmt = select(loans).order_by(loans.c.id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def circulation(since: Optional[datetime], until: Optional[datetime]):
+    """
+    Every loan borrowed in [since, until), archived ones included, joined with its member and item:
+        SELECT loan.*, members.name, ..., library_items.title, ...
+        FROM (SELECT ... FROM borrowed_items WHERE <range>
+              UNION ALL SELECT ... FROM borrowed_items_archive WHERE <range>) AS loan
+        JOIN members ... JOIN memberships ... JOIN library_items ...
+        ORDER BY loan.id
+    Columns in CirculationRecord order. Meant to be streamed (yield_per); a report covers
+    most of a month's loans, so the loan tables are scanned rather than read by index.
+    """
+    parts = []
+    for model in (BorrowedItemModel, BorrowedItemArchiveModel):
+        stmt = select(*_loan_columns(model))
+        if since is not None:
+            stmt = stmt.where(model.borrow_date >= since)
+        if until is not None:
+            stmt = stmt.where(model.borrow_date < until)
+        parts.append(stmt)
+
+    loans = union_all(*parts).subquery()
+    return select(
+        loans.c.id, loans.c.borrow_date, loans.c.due_date, loans.c.return_date, loans.c.status,
+        MemberModel.id, MemberModel.name, MemberModel.email, MembershipModel.membership_type,
+        LibraryItemModel.id, LibraryItemModel.title, LibraryItemModel.creator, LibraryItemModel.item_type
+    ).join(
+        MemberModel, MemberModel.id == loans.c.member_id
+    ).join(
+        MembershipModel, MembershipModel.id == MemberModel.membership_id
+    ).join(
+        LibraryItemModel, LibraryItemModel.id == loans.c.item_id
+    ).order_by(loans.c.id)
+
+
+def archive_loans(returned_before: datetime, chunk_size: int):
+    """
+    Copy the next chunk of loans returned before the cutoff into the archive:
+        INSERT INTO borrowed_items_archive (id, member_id, ...)
+        SELECT id, member_id, ... FROM borrowed_items
+        WHERE id IN (SELECT id FROM borrowed_items
+                     WHERE status = 'returned' AND return_date < :cutoff
+                     ORDER BY id LIMIT :chunk FOR UPDATE SKIP LOCKED)
+        RETURNING id
+    The caller deletes the returned ids from borrowed_items in the same transaction.
+    """
+    chunk = select(BorrowedItemModel.id).where(
+        BorrowedItemModel.status == 'returned',
+        BorrowedItemModel.return_date < returned_before
+    ).order_by(BorrowedItemModel.id).limit(chunk_size).with_for_update(skip_locked=True)
+
+    loans = select(*_loan_columns(BorrowedItemModel)).where(BorrowedItemModel.id.in_(chunk.scalar_subquery()))
+
+    return insert(BorrowedItemArchiveModel).from_select(
+        list(LoanRecord._fields), loans
+    ).returning(BorrowedItemArchiveModel.id)
+
+
+def delete_loans(loan_ids: List[int]):
+    return delete(BorrowedItemModel).where(
+        BorrowedItemModel.id.in_(loan_ids)
+    ).execution_options(synchronize_session=False)
+
+
+# ========================
+# ALSO BORROWED (CO-OCCURRENCE)
+# ========================
+def _upsert(model, dialect_name: str):
+    """INSERT that supports .on_conflict_do_update(), for the engine's dialect"""
+    if dialect_name == 'postgresql':
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+def _add_scores(stmt, model):
+    """... ON CONFLICT (item_id, related_item_id) DO UPDATE SET score = score + excluded.score"""
+    return stmt.on_conflict_do_update(
+        index_elements=[model.item_id, model.related_item_id],
+        set_={'score': model.score + stmt.excluded.score}
+    )
+
+
+def member_item_loans(member_id: int, limit: int):
+    """
+    (item_id, number of loans) for the member's `limit` most recently borrowed items,
+    archived loans included:
+        SELECT item_id, count(*) FROM (
+            SELECT id, item_id FROM borrowed_items WHERE member_id = :member_id
+            UNION ALL
+            SELECT id, item_id FROM borrowed_items_archive WHERE member_id = :member_id
+        ) GROUP BY item_id ORDER BY max(id) DESC LIMIT :limit
+    Both sides are read off the (member_id, borrow_date) indexes.
+    """
+    loans = union_all(*(
+        select(model.id, model.item_id).where(model.member_id == member_id)
+        for model in (BorrowedItemModel, BorrowedItemArchiveModel)
+    )).subquery()
+
+    return select(
+        loans.c.item_id, func.count().label('loans')
+    ).group_by(loans.c.item_id).order_by(func.max(loans.c.id).desc()).limit(limit)
+
+
+def add_cooccurrence(member_id: int, item_ids: List[int], limit: int, dialect_name: str):
+    """
+    +1 on every "also borrowed" pair of a newly borrowed item and another of the
+    member's `limit` most recent items, both directions, in one statement:
+        INSERT INTO item_cooccurrence (item_id, related_item_id, score)
+        WITH recent AS (<member_item_loans>),
+             new_items AS (SELECT item_id FROM recent WHERE item_id IN (:item_ids) AND loans = 1)
+        SELECT item_id, related_item_id, 1 FROM (
+            SELECT n.item_id, r.item_id FROM new_items n JOIN recent r ON r.item_id <> n.item_id
+            UNION
+            SELECT r.item_id, n.item_id FROM new_items n JOIN recent r ON r.item_id <> n.item_id
+        ) pairs ORDER BY item_id, related_item_id
+        ON CONFLICT (item_id, related_item_id) DO UPDATE SET score = item_cooccurrence.score + excluded.score
+
+    Run after the new loans were inserted (their loans have the highest ids, so they are
+    always in recent). Only items borrowed for the first time (one loan in either table)
+    count, so re-borrowing an item, even an archived one, adds nothing.
+    UNION drops the pair two new items would add twice (ON CONFLICT can't touch a row twice),
+    and the ORDER BY makes concurrent borrows sharing pairs lock them in the same order.
+    """
+    recent = member_item_loans(member_id, limit).cte('recent')
+    new = select(recent.c.item_id).where(
+        recent.c.item_id.in_(item_ids),
+        recent.c.loans == 1
+    ).cte('new_items')
+
+    pairs = union(*(
+        select(a.label('item_id'), b.label('related_item_id')).select_from(new).join(
+            recent, recent.c.item_id != new.c.item_id
+        )
+        for a, b in ((new.c.item_id, recent.c.item_id), (recent.c.item_id, new.c.item_id))
+    )).subquery('pairs')
+
+    # ORDER BY ends the SELECT, so SQLite can't mistake ON CONFLICT for a join constraint
+    rows = select(
+        pairs.c.item_id, pairs.c.related_item_id, literal(1)
+    ).order_by(pairs.c.item_id, pairs.c.related_item_id)
+
+    stmt = _upsert(ItemCooccurrenceModel, dialect_name).from_select(
+        ['item_id', 'related_item_id', 'score'], rows
+    )
+    return _add_scores(stmt, ItemCooccurrenceModel)
+
+
+def related_items(item_id: int, k: int):
+    """Top k co-borrowed items, best first, from the (item_id, score DESC) index"""
+    return select(LibraryItemModel).join(
+        ItemCooccurrenceModel, ItemCooccurrenceModel.related_item_id == LibraryItemModel.id
+    ).where(
+        ItemCooccurrenceModel.item_id == item_id
+    ).order_by(ItemCooccurrenceModel.score.desc(), LibraryItemModel.id).limit(k)
+
+
+def member_id_range(after_id: Optional[int], chunk_size: int):
+    """(first id, last id, count) of the next chunk_size members after after_id"""
+    chunk = select(MemberModel.id).order_by(MemberModel.id).limit(chunk_size)
+    if after_id is not None:
+        chunk = chunk.where(MemberModel.id > after_id)
+    chunk = chunk.subquery()
+    return select(func.min(chunk.c.id), func.max(chunk.c.id), func.count())
+
+
+def accumulate_cooccurrence(first_member_id: int, last_member_id: int, dialect_name: str):
+    """
+    Add one chunk of members' pair counts to the rebuild table:
+        INSERT INTO item_cooccurrence_rebuild (item_id, related_item_id, score)
+        SELECT a.item_id, b.item_id, COUNT(*)
+        FROM loans a JOIN loans b ON b.member_id = a.member_id AND b.item_id <> a.item_id
+        GROUP BY a.item_id, b.item_id
+        ON CONFLICT ... DO UPDATE SET score = score + excluded.score
+    where loans = distinct (member_id, item_id) of borrowed_items UNION borrowed_items_archive,
+    restricted to the chunk's member id range (read through the member_id indexes).
+    """
+    def loans():
+        return union(*[
+            select(model.member_id, model.item_id).where(model.member_id.between(first_member_id, last_member_id))
+            for model in (BorrowedItemModel, BorrowedItemArchiveModel)
+        ]).subquery()
+
+    a, b = loans(), loans()
+    pairs = select(
+        a.c.item_id, b.c.item_id, func.count()
+    ).join(
+        b, and_(b.c.member_id == a.c.member_id, b.c.item_id != a.c.item_id)
+    ).group_by(a.c.item_id, b.c.item_id)
+
+    # GROUP BY ends the SELECT, so SQLite can't mistake ON CONFLICT for a join constraint
+    stmt = _upsert(ItemCooccurrenceRebuildModel, dialect_name).from_select(
+        ['item_id', 'related_item_id', 'score'], pairs
+    )
+    return _add_scores(stmt, ItemCooccurrenceRebuildModel)
+
+
+def publish_cooccurrence(top_k: int):
+    """
+    Copy the top_k related items per item from the rebuild table into item_cooccurrence:
+        INSERT INTO item_cooccurrence (item_id, related_item_id, score)
+        SELECT item_id, related_item_id, score FROM (
+            SELECT *, row_number() OVER (PARTITION BY item_id ORDER BY score DESC, related_item_id) AS rank
+            FROM item_cooccurrence_rebuild) ranked
+        WHERE rank <= :top_k AND <both items still exist>
+    """
+    rebuild = ItemCooccurrenceRebuildModel
+    ranked = select(
+        rebuild.item_id, rebuild.related_item_id, rebuild.score,
+        func.row_number().over(
+            partition_by=rebuild.item_id,
+            order_by=(rebuild.score.desc(), rebuild.related_item_id)
+        ).label('rank')
+    ).subquery()
+
+    # items deleted while the rebuild ran would violate the foreign keys
+    item_exists = select(LibraryItemModel.id)
+    top = select(ranked.c.item_id, ranked.c.related_item_id, ranked.c.score).where(
+        ranked.c.rank <= top_k,
+        ranked.c.item_id.in_(item_exists),
+        ranked.c.related_item_id.in_(item_exists)
+    )
+    return insert(ItemCooccurrenceModel).from_select(['item_id', 'related_item_id', 'score'], top)
+
+
+# ========================
+# HOLD QUEUE
+# ========================
+def claim_next_hold(item_id: int, expires_at: datetime):
+    """
+    Reserve a copy for the head of an item's waiting list:
+        UPDATE waiting_list SET hold_expires_at = :expires_at
+        WHERE id = (SELECT id FROM waiting_list
+                    WHERE item_id = :item_id AND hold_expires_at IS NULL
+                    ORDER BY joined_at, id LIMIT 1 FOR UPDATE SKIP LOCKED)
+        RETURNING id
+    The head is found through the (item_id, joined_at) index. A row locked by another
+    transaction (e.g. that member leaving the list) is skipped rather than waited for.
+    """
+    head = select(WaitingListModel.id).where(
+        WaitingListModel.item_id == item_id,
+        WaitingListModel.hold_expires_at.is_(None)
+    ).order_by(
+        WaitingListModel.joined_at, WaitingListModel.id
+    ).limit(1).with_for_update(skip_locked=True).scalar_subquery()
+
+    return update(WaitingListModel).where(
+        WaitingListModel.id == head
+    ).values(
+        hold_expires_at=expires_at
+    ).returning(WaitingListModel.id).execution_options(synchronize_session=False)
+
+
+def notify_hold(entry_id: int, expires_at: datetime):
+    """
+    Tell the member a copy is waiting for them:
+        INSERT INTO notifications (member_id, message, is_read)
+        SELECT w.member_id, '"' || i.title || '" is on hold for you until ...', false
+        FROM waiting_list w JOIN library_items i ON i.id = w.item_id
+        WHERE w.id = :entry_id
+        RETURNING member_id
+    """
+    message = literal('"') + LibraryItemModel.title + literal(f'" is on hold for you until {expires_at:%Y-%m-%d %H:%M}')
+
+    hold = select(
+        WaitingListModel.member_id,
+        message,
+        literal(False)
+    ).join(
+        LibraryItemModel,
+        LibraryItemModel.id == WaitingListModel.item_id
+    ).where(
+        WaitingListModel.id == entry_id
+    )
+
+    return insert(NotificationModel).from_select(
+        ['member_id', 'message', 'is_read'], hold
+    ).returning(NotificationModel.member_id)
+
+
+def drop_expired_holds(now: datetime, chunk_size: int):
+    """
+    Take up to chunk_size expired holds off their waiting lists:
+        DELETE FROM waiting_list
+        WHERE id IN (SELECT id FROM waiting_list WHERE hold_expires_at < :now
+                     ORDER BY id LIMIT :chunk FOR UPDATE SKIP LOCKED)
+        RETURNING item_id
+    Served by the partial index on hold_expires_at; each returned item_id is one copy to pass on.
+    """
+    chunk = select(WaitingListModel.id).where(
+        WaitingListModel.hold_expires_at < now
+    ).order_by(WaitingListModel.id).limit(chunk_size).with_for_update(skip_locked=True)
+
+    return delete(WaitingListModel).where(
+        WaitingListModel.id.in_(chunk.scalar_subquery())
+    ).returning(WaitingListModel.item_id).execution_options(synchronize_session=False)
+
+
+# ========================
+# DUE-DATE REMINDERS
+# ========================
+def claim_reminders(level: int, due_before: datetime, due_from: Optional[datetime], chunk_size: int):
+    """
+    Raise reminder_level to `level` on up to chunk_size active loans due in [due_from, due_before)
+    that haven't had this reminder yet, returning their ids:
+        UPDATE borrowed_items SET reminder_level = :level
+        WHERE id IN (SELECT id FROM borrowed_items
+                     WHERE status = 'borrowed' AND due_date < :due_before [AND due_date >= :due_from]
+                       AND reminder_level < :level
+                     ORDER BY id LIMIT :chunk FOR UPDATE SKIP LOCKED)
+        RETURNING id
+    Claimed rows drop out of the WHERE clause, so calling it again moves on to the next chunk,
+    and two jobs running at once skip each other's rows.
+    """
+    due = [
+        BorrowedItemModel.status == 'borrowed',
+        BorrowedItemModel.due_date < due_before,
+        BorrowedItemModel.reminder_level < level
+    ]
+    if due_from is not None:
+        due.append(BorrowedItemModel.due_date >= due_from)
+
+    chunk = select(BorrowedItemModel.id).where(*due).order_by(
+        BorrowedItemModel.id
+    ).limit(chunk_size).with_for_update(skip_locked=True)
+
+    return update(BorrowedItemModel).where(
+        BorrowedItemModel.id.in_(chunk.scalar_subquery())
+    ).values(reminder_level=level).returning(BorrowedItemModel.id).execution_options(synchronize_session=False)
+
+
+def insert_reminders(loan_ids: List[int], before_title: str, after_title: str):
+    """
+    One notification per loan, message built in SQL from the item title:
+        INSERT INTO notifications (member_id, message, is_read)
+        SELECT b.member_id, :before || i.title || :after, false
+        FROM borrowed_items b JOIN library_items i ON i.id = b.item_id
+        WHERE b.id IN (:loan_ids)
+        RETURNING member_id
+    """
+    message = literal(before_title) + LibraryItemModel.title + literal(after_title)
+
+    reminders = select(
+        BorrowedItemModel.member_id,
+        message,
+        literal(False)
+    ).join(
+        LibraryItemModel,
+        LibraryItemModel.id == BorrowedItemModel.item_id
+    ).where(
+        BorrowedItemModel.id.in_(loan_ids)
+    )
+
+    return insert(NotificationModel).from_select(
+        ['member_id', 'message', 'is_read'], reminders
+    ).returning(NotificationModel.member_id)
+
+
+# ========================
+# WAITING LIST
+# ========================
+def waiting_list_entry(member_id: int, item_id: int):
+    return select(WaitingListModel).where(
+        WaitingListModel.member_id == member_id,
+        WaitingListModel.item_id == item_id
+    )
+
+
+def remove_waiting_list_entry(member_id: int, item_id: int):
+    """DELETE ... RETURNING hold_expires_at: not NULL if the entry held a copy that must be passed on"""
+    return delete(WaitingListModel).where(
+        WaitingListModel.member_id == member_id,
+        WaitingListModel.item_id == item_id
+    ).returning(WaitingListModel.hold_expires_at).execution_options(synchronize_session=False)
+
+
+def remove_member_holds(member_id: int):
+    """
+    DELETE a member's waiting list entries that hold a copy (expired or not) RETURNING item_id;
+    each returned item_id is one copy on the hold shelf to pass on.
+    """
+    return delete(WaitingListModel).where(
+        WaitingListModel.member_id == member_id,
+        WaitingListModel.hold_expires_at.isnot(None)
+    ).returning(WaitingListModel.item_id).execution_options(synchronize_session=False)
+
+
+def waiting_members(item_id: int):
+    """Members waiting for an item, in join order"""
+    return select(MemberModel).join(
+        WaitingListModel,
+        MemberModel.id == WaitingListModel.member_id
+    ).where(
+        WaitingListModel.item_id == item_id
+    ).order_by(WaitingListModel.joined_at)
+
+
+def notify_waiting_members(item_id: int):
+    """
+    Set-based fan-out, one statement however long the waiting list is:
+        INSERT INTO notifications (member_id, message, is_read)
+        SELECT w.member_id, '''' || i.title || ''' is now available', false
+        FROM waiting_list w JOIN library_items i ON i.id = w.item_id
+        WHERE w.item_id = :item_id AND w.hold_expires_at IS NULL
+        RETURNING member_id
+    Members with a copy on hold already got their notice from notify_hold.
+    """
+    # message is built in SQL from the item's title
+    message = literal("'") + LibraryItemModel.title + literal("' is now available")
+
+    waiting = select(
+        WaitingListModel.member_id,
+        message,
+        literal(False)
+    ).join(
+        LibraryItemModel,
+        LibraryItemModel.id == WaitingListModel.item_id
+    ).where(
+        WaitingListModel.item_id == item_id,
+        WaitingListModel.hold_expires_at.is_(None)
+    )
+
+    return insert(NotificationModel).from_select(
+        ['member_id', 'message', 'is_read'], waiting
+    ).returning(NotificationModel.member_id)
+
+
+# ========================
+# NOTIFICATIONS
+# ========================
+def member_notifications(member_id: int, unread_only: bool = False):
+    stmt = select(NotificationModel).where(NotificationModel.member_id == member_id)
+    if unread_only:
+        stmt = stmt.where(NotificationModel.is_read == False)
+    return stmt.order_by(NotificationModel.created_at.desc())
+
+
+def notification_inbox(member_id: int, unread_only: bool, limit: int, before_id: Optional[int]):
+    """
+    One page of notifications, newest first, keyset-paginated on (created_at, id).
+    Served by the (member_id, is_read, created_at DESC) index.
+    """
+    stmt = select(NotificationModel).where(NotificationModel.member_id == member_id)
+
+    if unread_only:
+        stmt = stmt.where(NotificationModel.is_read == False)
+
+    if before_id is not None:
+        # rows strictly after the cursor in (created_at DESC, id DESC) order
+        cursor_created_at = select(NotificationModel.created_at).where(
+            NotificationModel.id == before_id
+        ).scalar_subquery()
+        stmt = stmt.where(or_(
+            NotificationModel.created_at < cursor_created_at,
+            and_(NotificationModel.created_at == cursor_created_at, NotificationModel.id < before_id)
+        ))
+
+    return stmt.order_by(NotificationModel.created_at.desc(), NotificationModel.id.desc()).limit(limit)
+
+
+def unread_count(member_id: int):
+    return select(func.count(NotificationModel.id)).where(
+        NotificationModel.member_id == member_id,
+        NotificationModel.is_read == False
+    )
+
+
+def mark_notification_read(notification_id: int):
+    """UPDATE ... RETURNING member_id (no row if the notification doesn't exist)"""
+    return update(NotificationModel).where(
+        NotificationModel.id == notification_id
+    ).values(is_read=True).returning(NotificationModel.member_id).execution_options(synchronize_session=False)
+
+
+def mark_all_read(member_id: int, before: Optional[datetime] = None):
+    stmt = update(NotificationModel).where(
+        NotificationModel.member_id == member_id,
+        NotificationModel.is_read == False
+    )
+    if before is not None:
+        stmt = stmt.where(NotificationModel.created_at <= before)
+    return stmt.values(is_read=True).execution_options(synchronize_session=False)
+
+
+# ========================
+# CATALOG STATS
+# ========================
+def add_to_stats(deltas: dict, shard: int):
+    """
+    One UPDATE for all of a transaction's counter changes:
+        UPDATE catalog_stats SET value = value + CASE name WHEN 'active_loans' THEN 1 ... END
+        WHERE shard = :shard AND name IN (...)
+    """
+    return update(CatalogStatModel).where(
+        CatalogStatModel.shard == shard,
+        CatalogStatModel.name.in_(sorted(deltas))
+    ).values(
+        value=CatalogStatModel.value + case(deltas, value=CatalogStatModel.name)
+    ).execution_options(synchronize_session=False)
+
+
+def catalog_stats():
+    """SELECT name, sum(value) FROM catalog_stats GROUP BY name -- a fixed number of rows"""
+    return select(CatalogStatModel.name, func.sum(CatalogStatModel.value)).group_by(CatalogStatModel.name)
+
+
+def create_stat_rows(dialect_name: str):
+    """Zero rows for every counter shard that doesn't exist yet (INSERT ... ON CONFLICT DO NOTHING)"""
+    return _upsert(CatalogStatModel, dialect_name).values([
+        {'name': name, 'shard': shard, 'value': 0} for name in CATALOG_STATS for shard in range(STAT_SHARDS)
+    ]).on_conflict_do_nothing()
+
+
+def lock_stats():
+    """SELECT ... FOR UPDATE every counter row, in key order"""
+    return select(CatalogStatModel.name).order_by(
+        CatalogStatModel.name, CatalogStatModel.shard
+    ).with_for_update()
+
+
+def recount_stats():
+    """
+    The counters' true values, recounted from the tables, in one row (CATALOG_STATS order).
+    Full scans: for the reconcile job only.
+    """
+    def count_items(item_type):
+        return select(func.count()).where(LibraryItemModel.item_type == item_type).scalar_subquery()
+
+    return select(
+        count_items('book').label('books'),
+        count_items('dvd').label('dvds'),
+        select(func.coalesce(func.sum(LibraryItemModel.total_copies), 0)).scalar_subquery().label('total_copies'),
+        select(func.coalesce(func.sum(LibraryItemModel.available_copies), 0)).scalar_subquery().label('available_copies'),
+        select(func.count()).where(BorrowedItemModel.status == 'borrowed').scalar_subquery().label('active_loans'),
+        select(func.count()).select_from(WaitingListModel).scalar_subquery().label('waiting')
+    )
+
+
+def set_stats(values: dict):
+    """
+    Overwrite the counters: shard 0 gets the value, the other shards 0.
+        UPDATE catalog_stats SET value = CASE WHEN shard = 0 THEN CASE name WHEN ... END ELSE 0 END
+    """
+    return update(CatalogStatModel).where(
+        CatalogStatModel.name.in_(sorted(values))
+    ).values(
+        value=case((CatalogStatModel.shard == 0, case(values, value=CatalogStatModel.name)), else_=0)
+    ).execution_options(synchronize_session=False)
+
+
+def open_loans_and_waiting(item_id: Optional[int] = None, member_id: Optional[int] = None):
+    """
+    (active loans, waiting list entries) of an item or a member, in one SELECT;
+    what a CASCADE delete of the item / member takes off the counters.
+    """
+    loans = select(func.count()).where(BorrowedItemModel.status == 'borrowed')
+    waiting = select(func.count()).select_from(WaitingListModel)
+    if item_id is not None:
+        loans = loans.where(BorrowedItemModel.item_id == item_id)
+        waiting = waiting.where(WaitingListModel.item_id == item_id)
+    if member_id is not None:
+        loans = loans.where(BorrowedItemModel.member_id == member_id)
+        waiting = waiting.where(WaitingListModel.member_id == member_id)
+    return select(loans.scalar_subquery(), waiting.scalar_subquery())
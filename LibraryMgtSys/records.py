@@ -0,0 +1,135 @@
+"""
+Lightweight read-only records returned by DatabaseManager read paths.
+Unlike detached ORM objects they carry no session state and are safe to cache and share.
+
+They are plain tuples: no instance __dict__, no identity map entry, no lazy loaders,
+so a list of 100k records costs a fraction of the memory of 100k ORM objects.
+Loaded with column-only SELECTs (see queries.as_records).
+"""
+from datetime import datetime
+from typing import Any, List, NamedTuple, Optional
+
+
+class ItemRecord(NamedTuple):
+    """Snapshot of one library_items row"""
+    id: int
+    title: str
+    creator: str
+    item_type: str
+    total_copies: int
+    available_copies: int
+
+    def is_available(self) -> bool:
+        return self.available_copies > 0
+
+
+class MemberRecord(NamedTuple):
+    """One members row"""
+    id: int
+    name: str
+    email: str
+    membership_id: int
+    created_at: Optional[datetime]
+
+
+class NotificationRecord(NamedTuple):
+    """One notifications row"""
+    id: int
+    member_id: int
+    message: str
+    is_read: bool
+    created_at: Optional[datetime]
+
+
+class LoanRecord(NamedTuple):
+    """One loan, from borrowed_items or borrowed_items_archive"""
+    id: int
+    member_id: int
+    item_id: int
+    borrow_date: Optional[datetime]
+    due_date: Optional[datetime]
+    return_date: Optional[datetime]
+    status: str
+
+
+class CirculationRecord(NamedTuple):
+    """One loan joined with its member and item, as exported by DatabaseManager.export_circulation"""
+    loan_id: int
+    borrow_date: Optional[datetime]
+    due_date: Optional[datetime]
+    return_date: Optional[datetime]
+    status: str
+    member_id: int
+    member_name: str
+    member_email: str
+    membership_type: str
+    item_id: int
+    title: str
+    creator: str
+    item_type: str
+
+
+class CatalogStats(NamedTuple):
+    """Catalog-wide counters from the catalog_stats table (DatabaseManager.stats)"""
+    books: int
+    dvds: int
+    total_copies: int
+    available_copies: int
+    active_loans: int
+    waiting: int                    # waiting list entries, holds included
+
+    @property
+    def items(self) -> int:
+        return self.books + self.dvds
+
+
+class ProfileEntry(NamedTuple):
+    """An active loan or a waiting list entry on a member's profile, with its item"""
+    kind: str                       # 'loan' or 'waiting'
+    entry_id: int                   # borrowed_items.id / waiting_list.id
+    item_id: int
+    title: str
+    item_type: str
+    since: Optional[datetime]       # borrow_date / joined_at
+    until: Optional[datetime]       # due_date / hold_expires_at (None while still waiting)
+
+
+class MemberProfile(NamedTuple):
+    """
+    Everything a member page shows, from DatabaseManager.get_member_profile.
+    member is a detached MemberModel with its membership already loaded;
+    its other relationships (borrowed_items, notifications, ...) are not.
+    """
+    member: Any
+    unread_count: int
+    active_loans: List[ProfileEntry]
+    waiting_list: List[ProfileEntry]
+
+    @property
+    def membership(self):
+        return self.member.membership
+
+    @property
+    def holds(self) -> List[ProfileEntry]:
+        """waiting list entries with a copy on hold for the member"""
+        return [entry for entry in self.waiting_list if entry.until is not None]
+
+
+class BorrowOutcome(NamedTuple):
+    """
+    Result of one item in a multi-item checkout (DatabaseManager.borrow_items).
+    status is one of:
+        'borrowed'       loan created
+        'not_found'      no such item
+        'unavailable'    no copies left
+        'limit_reached'  member's borrow limit used up
+        'no_membership'  no such member, or membership expired
+        'duplicate'      item appeared earlier in the same request
+    """
+    item_id: int
+    status: str
+
+    @property
+    def borrowed(self) -> bool:
+        return self.status == 'borrowed'
+
@@ -19,6 +19,13 @@ create table library_items (
 	constraint check_type check (item_type in ('book', 'dvd'))
 );
 
+-- catalog search: full-text document + trigram indexes for typo-tolerant / substring search
+create extension if not exists pg_trgm;
+create index ix_library_items_search_tsv on library_items
+	using gin (to_tsvector('simple', title || ' ' || creator));
+create index ix_library_items_title_trgm on library_items using gin (title gin_trgm_ops);
+create index ix_library_items_creator_trgm on library_items using gin (creator gin_trgm_ops);
+
 create table books (
 	id integer primary key,
 	isbn varchar(20) not null unique,
@@ -45,6 +52,8 @@ create table memberships (
 	membership_type varchar(20) not null check (membership_type in ('regular', 'premium')),
 	borrow_limit integer not null,
 	expiry_date date,
+	is_active boolean not null default true,
+	expiry_warning_sent_for date,
 	created_at timestamp default current_timestamp,
 	updated_at timestamp default current_timestamp,
 	constraint check_expiry_date check (
@@ -54,6 +63,9 @@ create table memberships (
 	)
 );
 
+-- expiry sweep / warnings: premium memberships by expiry date
+create index ix_memberships_type_expiry on memberships (membership_type, expiry_date);
+
 create table members (
 	id serial primary key,
 	name varchar(255) not null,
@@ -79,8 +91,11 @@ create table borrowed_items (
 	member_id integer not null,
 	item_id integer not null,
 	borrow_date timestamp default current_timestamp,
+	due_date timestamp,
 	return_date timestamp,
 	status varchar(20) not null default 'borrowed' check (status in ('borrowed', 'returned')),
+	-- latest reminder sent: 0 none, 1 due soon, 2 overdue
+	reminder_level smallint not null default 0,
 	constraint fk_borrowed_member foreign key (member_id)
 		references members(id)
 		on update cascade 
@@ -91,11 +106,82 @@ create table borrowed_items (
 		on delete cascade 
 );
 
+-- partial index: only active loans, keeps borrow-limit counts cheap as history grows
+create index ix_borrowed_items_member_active on borrowed_items (member_id) where status = 'borrowed';
+-- an item's / a member's borrow history, newest first
+create index ix_borrowed_items_item_borrow_date on borrowed_items (item_id, borrow_date);
+create index ix_borrowed_items_member_borrow_date on borrowed_items (member_id, borrow_date);
+-- reminder job: active loans due before a cutoff
+create index ix_borrowed_items_status_due on borrowed_items (status, due_date);
+
+-- returned loans moved out of borrowed_items by the archive job (ids are kept)
+create table borrowed_items_archive (
+	id integer primary key,
+	member_id integer not null,
+	item_id integer not null,
+	borrow_date timestamp,
+	due_date timestamp,
+	return_date timestamp,
+	status varchar(20) not null default 'returned',
+	constraint fk_archive_member foreign key (member_id)
+		references members(id)
+		on update cascade
+		on delete cascade,
+	constraint fk_archive_item foreign key (item_id)
+		references library_items(id)
+		on update cascade
+		on delete cascade
+);
+
+create index ix_borrowed_items_archive_item_borrow_date on borrowed_items_archive (item_id, borrow_date);
+create index ix_borrowed_items_archive_member_borrow_date on borrowed_items_archive (member_id, borrow_date);
+
+-- "also borrowed": members who borrowed both items, both directions, top K per item after a rebuild
+create table item_cooccurrence (
+	item_id integer not null,
+	related_item_id integer not null,
+	score integer not null default 0,
+	primary key (item_id, related_item_id),
+	constraint fk_cooccurrence_item foreign key (item_id)
+		references library_items(id)
+		on update cascade
+		on delete cascade,
+	constraint fk_cooccurrence_related foreign key (related_item_id)
+		references library_items(id)
+		on update cascade
+		on delete cascade
+);
+
+create index ix_item_cooccurrence_item_score on item_cooccurrence (item_id, score desc);
+
+-- scratch table for the nightly rebuild
+create table item_cooccurrence_rebuild (
+	item_id integer not null,
+	related_item_id integer not null,
+	score integer not null default 0,
+	primary key (item_id, related_item_id)
+);
+
+-- catalog-wide counters (books, dvds, total_copies, available_copies, active_loans, waiting),
+-- 16 shard rows each; a counter's value is the sum of its shards
+create table catalog_stats (
+	name varchar(32) not null,
+	shard smallint not null,
+	value bigint not null default 0,
+	primary key (name, shard)
+);
+
+insert into catalog_stats (name, shard, value)
+select name, shard, 0
+from unnest(array['books', 'dvds', 'total_copies', 'available_copies', 'active_loans', 'waiting']) as name,
+	generate_series(0, 15) as shard;
+
 create table waiting_list (
 	id serial primary key,
 	member_id integer not null,
 	item_id integer not null,
 	joined_at timestamp default current_timestamp,
+	hold_expires_at timestamp,
 	constraint fk_waiting_member foreign key (member_id)
 		references members(id)
 		on update cascade
@@ -107,6 +193,11 @@ create table waiting_list (
 	constraint unique_waiting_member_item unique (member_id, item_id)
 );
 
+-- an item's waiting list in join order
+create index ix_waiting_list_item_joined on waiting_list (item_id, joined_at);
+-- partial index: only current holds, for the expiry sweep
+create index ix_waiting_list_hold_expires on waiting_list (hold_expires_at) where hold_expires_at is not null;
+
 create table notifications (
 	id serial primary key,
 	member_id integer not null,
@@ -119,6 +210,9 @@ create table notifications (
 		on delete cascade 
 );
 
+-- inbox queries: a member's (unread) notifications, newest first
+create index ix_notifications_member_inbox on notifications (member_id, is_read, created_at desc);
+
 -- Insert library items (books first)
 INSERT INTO library_items (title, creator, item_type, total_copies, available_copies) VALUES
 ('The Great Gatsby', 'F. Scott Fitzgerald', 'book', 3, 2),
@@ -180,15 +274,16 @@ ADD CONSTRAINT fk_memberships_member FOREIGN KEY (member_id)
     ON DELETE CASCADE;
 
 -- Insert borrowed items
-INSERT INTO borrowed_items (member_id, item_id, borrow_date, return_date, status) VALUES
-(1, 1, current_timestamp - interval '5 days', NULL, 'borrowed'),
-(2, 6, current_timestamp - interval '3 days', NULL, 'borrowed'),
-(3, 4, current_timestamp - interval '10 days', current_timestamp - interval '2 days', 'returned'),
-(4, 3, current_timestamp - interval '7 days', NULL, 'borrowed'),
-(5, 7, current_timestamp - interval '4 days', NULL, 'borrowed'),
-(1, 2, current_timestamp - interval '15 days', current_timestamp - interval '8 days', 'returned'),
-(6, 8, current_timestamp - interval '2 days', NULL, 'borrowed'),
-(6, 8, current_timestamp - interval '1 day', NULL, 'borrowed');
+-- due_date = borrow_date + 14 days (regular) / 28 days (premium)
+INSERT INTO borrowed_items (member_id, item_id, borrow_date, due_date, return_date, status) VALUES
+(1, 1, current_timestamp - interval '5 days', current_timestamp + interval '9 days', NULL, 'borrowed'),
+(2, 6, current_timestamp - interval '3 days', current_timestamp + interval '25 days', NULL, 'borrowed'),
+(3, 4, current_timestamp - interval '10 days', current_timestamp + interval '18 days', current_timestamp - interval '2 days', 'returned'),
+(4, 3, current_timestamp - interval '7 days', current_timestamp + interval '7 days', NULL, 'borrowed'),
+(5, 7, current_timestamp - interval '4 days', current_timestamp + interval '24 days', NULL, 'borrowed'),
+(1, 2, current_timestamp - interval '15 days', current_timestamp - interval '1 day', current_timestamp - interval '8 days', 'returned'),
+(6, 8, current_timestamp - interval '2 days', current_timestamp + interval '12 days', NULL, 'borrowed'),
+(6, 8, current_timestamp - interval '1 day', current_timestamp + interval '13 days', NULL, 'borrowed');
 
 -- Insert waiting list entries
 INSERT INTO waiting_list (member_id, item_id, joined_at) VALUES
@@ -206,4 +301,15 @@ INSERT INTO notifications (member_id, message, is_read, created_at) VALUES
 (5, 'Your premium membership will expire on 2026-09-15', false, current_timestamp - interval '1 day'),
 (6, 'All copies of "Pulp Fiction" are currently borrowed. You are #1 on the waiting list.', false, current_timestamp - interval '2 days'),
 (3, 'The item "Pulp Fiction" you are waiting for is still unavailable', true, current_timestamp - interval '1 day'),
-(2, 'Your waiting list request for "The Great Gatsby" has been noted', true, current_timestamp - interval '1 day');
\ No newline at end of file
+(2, 'Your waiting list request for "The Great Gatsby" has been noted', true, current_timestamp - interval '1 day');
+-- Catalog counters for the sample data above (same as DatabaseManager.reconcile_stats)
+UPDATE catalog_stats s SET value = CASE WHEN s.shard = 0 THEN t.value ELSE 0 END
+FROM (
+	SELECT 'books' AS name, count(*) AS value FROM library_items WHERE item_type = 'book'
+	UNION ALL SELECT 'dvds', count(*) FROM library_items WHERE item_type = 'dvd'
+	UNION ALL SELECT 'total_copies', coalesce(sum(total_copies), 0) FROM library_items
+	UNION ALL SELECT 'available_copies', coalesce(sum(available_copies), 0) FROM library_items
+	UNION ALL SELECT 'active_loans', count(*) FROM borrowed_items WHERE status = 'borrowed'
+	UNION ALL SELECT 'waiting', count(*) FROM waiting_list
+) t
+WHERE t.name = s.name;
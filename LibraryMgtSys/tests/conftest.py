@@ -0,0 +1,14 @@
+import pytest
+
+from database_manager import DatabaseManager
+from db_config import DatabaseConfig
+
+
+@pytest.fixture
+def db():
+    """A fresh in-memory SQLite DatabaseManager per test"""
+    DatabaseManager.reset_instance()
+    db = DatabaseManager(DatabaseConfig(url='sqlite://'))
+    db.create_tables()
+    yield db
+    DatabaseManager.reset_instance()
@@ -0,0 +1,393 @@
+import csv
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from models import LibraryItemModel, ItemCooccurrenceModel
+
+
+def add_member(db, name, borrow_limit=3, expiry_date=None):
+    membership_type = 'premium' if expiry_date else 'regular'
+    return db.add_member(name, f'{name}@example.com', membership_type, borrow_limit, expiry_date)
+
+
+def available(db, item_id):
+    return db.get_item_by_id(item_id).available_copies
+
+
+def test_borrow_and_return(db):
+    book = db.add_book('Dune', 'Frank Herbert', 1, '978-0441013593', 412)
+    alice, bob = add_member(db, 'alice'), add_member(db, 'bob')
+
+    assert db.borrow_item(alice.id, book.id)
+    assert available(db, book.id) == 0
+    assert not db.borrow_item(bob.id, book.id)
+    assert db.count_active_borrows(alice.id) == 1
+
+    assert db.return_item(alice.id, book.id)
+    assert not db.return_item(alice.id, book.id)
+    assert available(db, book.id) == 1
+    assert db.count_active_borrows(alice.id) == 0
+    assert [loan.status for loan in db.get_item_borrow_history(book.id)] == ['returned']
+
+
+def test_borrow_limit(db):
+    books = [db.add_book(f'Book {i}', 'Author', 1, f'isbn-{i}', 100) for i in range(3)]
+    alice = add_member(db, 'alice', borrow_limit=2)
+
+    assert [db.borrow_item(alice.id, book.id) for book in books] == [True, True, False]
+    assert available(db, books[2].id) == 1
+
+
+def test_returned_copy_is_held_for_first_waiter(db):
+    book = db.add_book('Dune', 'Frank Herbert', 1, '978-0441013593', 412)
+    alice, bob, carol = add_member(db, 'alice'), add_member(db, 'bob'), add_member(db, 'carol')
+    db.borrow_item(alice.id, book.id)
+    assert db.join_waiting_list(bob.id, book.id)
+    assert not db.join_waiting_list(bob.id, book.id)
+    db.join_waiting_list(carol.id, book.id)
+
+    db.return_item(alice.id, book.id)
+
+    # the copy skips the shelf: only bob is told, and only bob can take it
+    assert available(db, book.id) == 0
+    assert db.get_unread_count(bob.id) == 1
+    assert db.get_unread_count(carol.id) == 0
+    assert not db.borrow_item(carol.id, book.id)
+    assert db.borrow_item(bob.id, book.id)
+    assert [m.id for m in db.get_waiting_list(book.id)] == [carol.id]
+
+
+def test_leaving_with_a_hold_passes_the_copy_on(db):
+    book = db.add_book('Dune', 'Frank Herbert', 1, '978-0441013593', 412)
+    alice, bob, carol = add_member(db, 'alice'), add_member(db, 'bob'), add_member(db, 'carol')
+    db.borrow_item(alice.id, book.id)
+    db.join_waiting_list(bob.id, book.id)
+    db.join_waiting_list(carol.id, book.id)
+    db.return_item(alice.id, book.id)
+
+    assert db.leave_waiting_list(bob.id, book.id)
+    assert db.get_unread_count(carol.id) == 1
+    assert db.borrow_item(carol.id, book.id)
+
+
+def test_remove_member_passes_held_copy_on(db):
+    book = db.add_book('Dune', 'Frank Herbert', 1, '978-0441013593', 412)
+    alice, bob, carol = add_member(db, 'alice'), add_member(db, 'bob'), add_member(db, 'carol')
+    db.borrow_item(alice.id, book.id)
+    db.join_waiting_list(bob.id, book.id)
+    db.join_waiting_list(carol.id, book.id)
+    db.return_item(alice.id, book.id)
+
+    assert db.remove_member(bob.id)
+    assert db.get_member_by_id(bob.id) is None
+    assert db.get_unread_count(carol.id) == 1
+    assert db.borrow_item(carol.id, book.id)
+
+
+def test_remove_member_returns_held_copy_to_shelf(db):
+    book = db.add_book('Dune', 'Frank Herbert', 1, '978-0441013593', 412)
+    alice, bob = add_member(db, 'alice'), add_member(db, 'bob')
+    db.borrow_item(alice.id, book.id)
+    db.join_waiting_list(bob.id, book.id)
+    db.return_item(alice.id, book.id)
+
+    assert db.remove_member(bob.id)
+    assert available(db, book.id) == 1
+    assert db.stats().waiting == 0
+    assert not db.remove_member(bob.id)
+
+
+def test_add_member_with_past_expiry_is_notified(db):
+    expired = add_member(db, 'alice', expiry_date=date.today() - timedelta(days=1))
+    current = add_member(db, 'bob', expiry_date=date.today() + timedelta(days=30))
+
+    assert not db.can_borrow(expired.id)
+    assert db.get_unread_count(expired.id) == 1
+    assert db.get_unread_count(current.id) == 0
+
+
+def test_stats_follow_writes(db):
+    book = db.add_book('Dune', 'Frank Herbert', 2, '978-0441013593', 412)
+    db.add_dvd('Alien', 'Ridley Scott', 1, 117, 'Sci-Fi')
+    alice, bob = add_member(db, 'alice'), add_member(db, 'bob')
+    db.borrow_item(alice.id, book.id)
+    db.join_waiting_list(bob.id, book.id)
+
+    stats = db.stats()
+    assert (stats.books, stats.dvds, stats.total_copies) == (1, 1, 3)
+    assert (stats.available_copies, stats.active_loans, stats.waiting) == (2, 1, 1)
+    assert db.reconcile_stats() == {}
+
+
+def test_reconcile_stats_fixes_drift(db):
+    book = db.add_book('Dune', 'Frank Herbert', 2, '978-0441013593', 412)
+    # a write around DatabaseManager: the counters don't see it
+    with db.get_session() as session:
+        session.execute(update(LibraryItemModel).where(LibraryItemModel.id == book.id).values(available_copies=0))
+    assert db.stats().available_copies == 2
+
+    assert db.reconcile_stats() == {'available_copies': -2}
+    assert db.stats().available_copies == 0
+    assert db.reconcile_stats() == {}
+
+
+def test_add_books_bulk_rejects_bad_rows(db, tmp_path):
+    rows = [
+        {'title': 'Dune', 'author': 'Frank Herbert', 'copies': 2, 'isbn': 'isbn-1', 'num_pages': 412},
+        {'title': 'Emma', 'author': 'Jane Austen', 'copies': 0, 'isbn': 'isbn-2', 'num_pages': 474},
+        {'title': 'Kindred', 'author': 'Octavia Butler', 'copies': 1, 'isbn': 'isbn-3'},
+        {'title': 'Dune again', 'author': 'Frank Herbert', 'copies': 1, 'isbn': 'isbn-1', 'num_pages': 412},
+        {'title': 'Solaris', 'author': 'Stanislaw Lem', 'copies': 3, 'isbn': 'isbn-4', 'num_pages': 204},
+    ]
+    reject_file = tmp_path / 'rejects.jsonl'
+    progress = []
+
+    loaded, rejected = db.add_books_bulk(rows, chunk_size=3, progress=lambda *p: progress.append(p),
+                                         reject_file=str(reject_file))
+
+    assert (loaded, rejected) == (2, 3)
+    assert progress[-1] == (2, 3)
+    # bad values and missing fields are caught before the INSERT, the duplicate ISBN by it
+    rejects = [json.loads(line)['row']['title'] for line in reject_file.read_text().splitlines()]
+    assert sorted(rejects) == ['Dune again', 'Emma', 'Kindred']
+    assert db.count_items() == 2
+    stats = db.stats()
+    assert (stats.books, stats.total_copies, stats.available_copies) == (2, 5, 5)
+
+
+def test_borrow_items_outcomes(db):
+    first, taken, second, third = (db.add_book(f'Book {i}', 'Author', 1, f'isbn-{i}', 100) for i in range(4))
+    alice, bob = add_member(db, 'alice', borrow_limit=2), add_member(db, 'bob')
+    db.borrow_item(bob.id, taken.id)
+
+    outcomes = db.borrow_items(alice.id, [first.id, 999, first.id, taken.id, second.id, third.id])
+
+    assert [outcome.status for outcome in outcomes] == [
+        'borrowed', 'not_found', 'duplicate', 'unavailable', 'borrowed', 'limit_reached'
+    ]
+    assert [outcome.item_id for outcome in outcomes if outcome.borrowed] == [first.id, second.id]
+    assert db.count_active_borrows(alice.id) == 2
+    assert available(db, third.id) == 1
+    assert [outcome.status for outcome in db.borrow_items(999, [third.id])] == ['no_membership']
+    assert db.borrow_items(alice.id, []) == []
+    assert db.reconcile_stats() == {}
+
+
+def test_borrow_items_takes_held_copy_and_leaves_waiting_list(db):
+    held, shelved = (db.add_book(f'Book {i}', 'Author', 1, f'isbn-{i}', 100) for i in range(2))
+    alice, bob = add_member(db, 'alice'), add_member(db, 'bob')
+    db.borrow_item(alice.id, held.id)
+    db.join_waiting_list(bob.id, held.id)
+    db.join_waiting_list(bob.id, shelved.id)
+    db.return_item(alice.id, held.id)
+
+    assert all(outcome.borrowed for outcome in db.borrow_items(bob.id, [held.id, shelved.id]))
+    assert db.get_waiting_list(held.id) == [] and db.get_waiting_list(shelved.id) == []
+    assert (available(db, held.id), available(db, shelved.id)) == (0, 0)
+    assert db.reconcile_stats() == {}
+
+
+def test_borrowing_from_shelf_leaves_waiting_list(db):
+    book = db.add_book('Dune', 'Frank Herbert', 2, '978-0441013593', 412)
+    alice, bob, carol = add_member(db, 'alice'), add_member(db, 'bob'), add_member(db, 'carol')
+    db.join_waiting_list(bob.id, book.id)
+    db.join_waiting_list(carol.id, book.id)
+
+    assert db.borrow_item(alice.id, book.id)
+    assert db.borrow_item(bob.id, book.id)
+    assert [m.id for m in db.get_waiting_list(book.id)] == [carol.id]
+
+    # the next copy back goes to carol, not to bob who already has one
+    db.return_item(alice.id, book.id)
+    assert db.get_unread_count(carol.id) == 1
+    assert db.borrow_item(carol.id, book.id)
+
+
+def test_notify_waiting_members_skips_holders(db):
+    book = db.add_book('Dune', 'Frank Herbert', 1, '978-0441013593', 412)
+    alice, bob, carol = add_member(db, 'alice'), add_member(db, 'bob'), add_member(db, 'carol')
+    db.borrow_item(alice.id, book.id)
+    db.join_waiting_list(bob.id, book.id)
+    db.join_waiting_list(carol.id, book.id)
+    db.return_item(alice.id, book.id)
+
+    assert db.notify_waiting_members(book.id) == 1
+    assert db.get_unread_count(bob.id) == 1
+    assert db.get_unread_count(carol.id) == 1
+    assert db.notify_waiting_members(999) == 0
+
+
+def test_send_due_reminders_escalates_once(db):
+    soon, late = (db.add_book(f'Book {i}', 'Author', 1, f'isbn-{i}', 100) for i in range(2))
+    alice, bob = add_member(db, 'alice'), add_member(db, 'bob')
+    db.borrow_item(alice.id, soon.id)
+    now = datetime.now()
+
+    # regular loans are due in 14 days
+    assert db.send_due_reminders(now=now + timedelta(days=13)) == {'overdue': 0, 'due_soon': 1}
+    assert db.send_due_reminders(now=now + timedelta(days=13)) == {'overdue': 0, 'due_soon': 0}
+    assert db.send_due_reminders(now=now + timedelta(days=15)) == {'overdue': 1, 'due_soon': 0}
+    assert db.send_due_reminders(now=now + timedelta(days=15)) == {'overdue': 0, 'due_soon': 0}
+
+    # never reminded and already overdue: only the overdue reminder
+    db.borrow_item(bob.id, late.id)
+    assert db.send_due_reminders(now=now + timedelta(days=20)) == {'overdue': 1, 'due_soon': 0}
+
+    messages = [n.message for n in db.get_member_notifications(alice.id)]
+    assert sorted(messages) == ['"Book 0" is overdue, please return it',
+                                'Reminder: "Book 0" is due within 2 days']
+    assert [n.message for n in db.get_member_notifications(bob.id)] == ['"Book 1" is overdue, please return it']
+
+    # returned loans are left alone
+    db.return_item(alice.id, soon.id)
+    db.return_item(bob.id, late.id)
+    assert db.send_due_reminders(now=now + timedelta(days=40)) == {'overdue': 0, 'due_soon': 0}
+
+
+def test_archive_returned_loans_and_history_pages(db):
+    book = db.add_book('Dune', 'Frank Herbert', 1, '978-0441013593', 412)
+    alice = add_member(db, 'alice')
+    for _ in range(3):
+        db.borrow_item(alice.id, book.id)
+        db.return_item(alice.id, book.id)
+    db.borrow_item(alice.id, book.id)
+
+    assert db.archive_returned_loans(older_than_days=30) == 0
+    assert db.archive_returned_loans(older_than_days=30, chunk_size=2, now=datetime.now() + timedelta(days=31)) == 3
+
+    history = db.get_item_borrow_history(book.id)
+    assert [loan.status for loan in history] == ['borrowed', 'returned', 'returned', 'returned']
+    assert [type(loan).__name__ for loan in history] == ['BorrowedItemModel'] + ['BorrowedItemArchiveModel'] * 3
+
+    page = db.get_item_borrow_history_page(book.id, limit=3)
+    older = db.get_item_borrow_history_page(book.id, limit=3, before_id=page[-1].id)
+    assert [loan.id for loan in page + older] == [loan.id for loan in history]
+    assert db.get_member_borrow_history_page(alice.id, limit=10) == page + older
+    assert [loan.id for loan in db.iter_borrow_history(book.id, batch_size=2)] == sorted(loan.id for loan in history)
+
+    # archived ids are never handed out again
+    db.return_item(alice.id, book.id)
+    db.borrow_item(alice.id, book.id)
+    assert len({loan.id for loan in db.get_item_borrow_history(book.id)}) == 5
+
+
+def test_expiry_warnings_and_sweep(db):
+    today = date.today()
+    expiring = add_member(db, 'alice', expiry_date=today + timedelta(days=1))
+    later = add_member(db, 'bob', expiry_date=today + timedelta(days=30))
+    regular = add_member(db, 'carol')
+
+    assert db.send_expiry_warnings(days_ahead=7, today=today) == 1
+    assert db.send_expiry_warnings(days_ahead=7, today=today) == 0
+
+    assert db.expire_memberships(today=today + timedelta(days=2)) == 1
+    assert db.expire_memberships(today=today + timedelta(days=2)) == 0
+
+    assert not db.can_borrow(expiring.id)
+    assert db.can_borrow(later.id) and db.can_borrow(regular.id)
+    assert sorted(n.message for n in db.get_member_notifications(expiring.id)) == [
+        f"Your premium membership expired on {today + timedelta(days=1)}",
+        f"Your premium membership will expire on {today + timedelta(days=1)}",
+    ]
+    assert db.get_unread_count(later.id) == 0
+
+
+def test_get_member_profile(db):
+    loaned, held, waited = (db.add_book(f'Book {i}', 'Author', 1, f'isbn-{i}', 100) for i in range(3))
+    alice, bob = add_member(db, 'alice'), add_member(db, 'bob')
+    db.borrow_item(bob.id, held.id)
+    db.borrow_item(bob.id, waited.id)
+    db.borrow_item(alice.id, loaned.id)
+    db.join_waiting_list(alice.id, held.id)
+    db.join_waiting_list(alice.id, waited.id)
+    db.return_item(bob.id, held.id)
+
+    profile = db.get_member_profile(alice.id)
+
+    assert profile.member.name == 'alice'
+    assert profile.membership.membership_type == 'regular'
+    assert profile.unread_count == 1
+    assert [(entry.item_id, entry.title) for entry in profile.active_loans] == [(loaned.id, 'Book 0')]
+    assert sorted(entry.item_id for entry in profile.waiting_list) == [held.id, waited.id]
+    assert [entry.item_id for entry in profile.holds] == [held.id]
+    assert db.get_member_profile(999) is None
+
+
+def cooccurrence(db):
+    with db.get_session() as session:
+        return set(session.execute(select(
+            ItemCooccurrenceModel.item_id, ItemCooccurrenceModel.related_item_id, ItemCooccurrenceModel.score
+        )).all())
+
+
+def test_incremental_cooccurrence_matches_rebuild(db):
+    items = [db.add_book(f'Book {i}', 'Author', 5, f'isbn-{i}', 100).id for i in range(5)]
+    members = [add_member(db, name, borrow_limit=5).id for name in ('alice', 'bob', 'carol')]
+
+    db.borrow_item(members[0], items[0])
+    db.borrow_item(members[0], items[1])
+    db.return_item(members[0], items[0])
+    db.archive_returned_loans(older_than_days=0, now=datetime.now() + timedelta(days=1))
+    # re-borrowing an archived item adds nothing, new items pair with archived ones
+    db.borrow_item(members[0], items[0])
+    db.borrow_items(members[0], [items[2], items[3]])
+    db.borrow_items(members[1], [items[1], items[2]])
+    db.borrow_item(members[2], items[4])
+    db.borrow_item(members[2], items[1])
+
+    incremental = cooccurrence(db)
+    assert (items[1], items[2], 2) in incremental
+    assert (items[4], items[1], 1) in incremental
+
+    assert db.rebuild_cooccurrence(top_k=10) == {'members': 3, 'pairs': len(incremental)}
+    assert cooccurrence(db) == incremental
+    assert [item.id for item in db.get_related_items(items[1], k=2)] == [items[2], items[0]]
+
+
+def test_export_circulation_csv(db, tmp_path):
+    book = db.add_book('Dune', 'Frank Herbert', 1, '978-0441013593', 412)
+    alice = add_member(db, 'alice')
+    db.borrow_item(alice.id, book.id)
+    db.return_item(alice.id, book.id)
+    db.archive_returned_loans(older_than_days=0, now=datetime.now() + timedelta(days=1))
+    db.borrow_item(alice.id, book.id)
+    path = tmp_path / 'circulation.csv'
+
+    result = db.export_circulation(str(path), batch_size=1)
+
+    assert result['rows'] == 2
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert [(row['status'], row['member_email'], row['title']) for row in rows] == [
+        ('returned', 'alice@example.com', 'Dune'), ('borrowed', 'alice@example.com', 'Dune')
+    ]
+    assert db.export_circulation(str(path), until=datetime.now() - timedelta(days=1))['rows'] == 0
+    with pytest.raises(ValueError):
+        db.export_circulation(str(tmp_path / 'circulation.xlsx'))
+
+
+def test_notification_inbox_and_unread_count_cache(db):
+    alice = add_member(db, 'alice')
+    assert db.get_unread_count(alice.id) == 0
+
+    # every write invalidates the cached count
+    for i in range(5):
+        db.create_notification(alice.id, f'message {i}')
+    ids = sorted(n.id for n in db.get_member_notifications(alice.id))
+    assert db.get_unread_count(alice.id) == 5
+    assert db.mark_notification_read(ids[0])
+    assert db.get_unread_count(alice.id) == 4
+
+    page = db.get_notification_inbox(alice.id, limit=2)
+    older = db.get_notification_inbox(alice.id, limit=10, before_id=page[-1].id)
+    assert [n.id for n in page + older] == sorted(ids, reverse=True)
+    assert [n.id for n in db.get_notification_inbox(alice.id, unread_only=True)] == sorted(ids[1:], reverse=True)
+
+    assert db.mark_all_read(alice.id, before=datetime.now() - timedelta(days=1)) == 0
+    assert db.mark_all_read(alice.id) == 4
+    assert db.get_unread_count(alice.id) == 0
+    assert db.mark_all_read(alice.id) == 0
+    assert db.get_notification_inbox(alice.id, unread_only=True) == []